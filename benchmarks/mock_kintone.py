@@ -0,0 +1,209 @@
+"""In-process stand-in for the Kintone REST API, served through `httpx.MockTransport`
+
+Apps are synthetic: record values are generated from the record id on request,
+so apps with millions of records cost no memory until their pages are fetched.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Callable,
+)
+from dataclasses import dataclass, field
+
+import json
+import random
+import re
+import threading
+import time
+
+import httpx
+
+# Field types that can be generated, mapped to a value generator taking the record id and field index
+ValueGenerators: dict[str, Callable[[int, int], Any]] = {
+    'SINGLE_LINE_TEXT': lambda id, i: f'text-{id}-{i}',
+    'MULTI_LINE_TEXT': lambda id, i: f'line one {id}\nline two {i}',
+    'RICH_TEXT': lambda id, i: f'<div><b>{id}</b>{"lorem ipsum " * 20}</div>',
+    'NUMBER': lambda id, i: str((id * 31 + i) % 10_000 / 4),
+    'DATE': lambda id, i: f'2024-{1 + id % 12:02d}-{1 + id % 28:02d}',
+    'DATETIME': lambda id, i: f'2024-{1 + id % 12:02d}-{1 + id % 28:02d}T{id % 24:02d}:{i % 60:02d}:00Z',
+    'DROP_DOWN': lambda id, i: ('Open', 'In progress', 'Done')[id % 3],
+    'CHECK_BOX': lambda id, i: [option for n, option in enumerate(('A', 'B', 'C')) if (id >> n) & 1],
+    'SUBTABLE': lambda id, i: [
+        {'id': str(id * 10 + row), 'value': {f'cell_{i}': {'type': 'NUMBER', 'value': str(row)}}}
+        for row in range(id % 4)
+    ],
+}
+
+DefaultFieldMix: dict[str, int] = {
+    'SINGLE_LINE_TEXT': 4,
+    'NUMBER': 3,
+    'DATETIME': 1,
+    'DROP_DOWN': 1,
+    'CHECK_BOX': 1,
+}
+
+@dataclass
+class SyntheticApp:
+    """A generated app with records `$id` 1 to `size`
+
+    Args:
+        size: Number of records
+        field_mix: Number of fields per field type (default: `DefaultFieldMix`)
+    """
+    size: int
+    field_mix: dict[str, int] = field(default_factory=lambda: dict(DefaultFieldMix))
+
+    def __post_init__(self):
+        self.fields: dict[str, str] = {
+            f'{field_type.lower()}_{i}': field_type
+            for field_type, count in self.field_mix.items()
+            for i in range(count)
+        }
+
+    def record(self, id: int, fields: list[str] | None = None) -> dict[str, dict[str, Any]]:
+        record = {
+            '$id': {'type': '__ID__', 'value': str(id)},
+            '$revision': {'type': '__REVISION__', 'value': '1'},
+        }
+        for i, (code, field_type) in enumerate(self.fields.items()):
+            if fields is None or code in fields:
+                record[code] = {'type': field_type, 'value': ValueGenerators[field_type](id, i)}
+
+        if fields is not None:
+            record = {code: value for code, value in record.items() if code in fields}
+        return record
+
+    def properties(self) -> dict[str, dict[str, Any]]:
+        return {
+            code: {'type': field_type, 'code': code, 'label': code}
+            for code, field_type in self.fields.items()
+        }
+
+class MockKintone:
+    """Kintone stand-in supporting the record paging, bulk write and form field endpoints
+
+    Args:
+        apps: Synthetic apps keyed by app id
+        latency: Seconds added to every request (default: 0)
+        jitter: Maximum random seconds added on top of `latency` (default: 0)
+        seed: Seed for the jitter (default: 0)
+
+    Example:
+        >>> mock = MockKintone({1: SyntheticApp(10_000)}, latency=0.05)
+        >>> kintone = KintonePortal('https://mock.kintone.com', KintoneAuth('token'), transport=mock.transport())
+    """
+    _cursor = re.compile(r'\$id\s*>\s*"?(\d+)"?')
+    _limit = re.compile(r'limit\s+(\d+)')
+    _offset = re.compile(r'offset\s+(\d+)')
+    _in = re.compile(r'(\S+)\s+in\s+\(([^)]*)\)')
+
+    def __init__(self, apps: dict[int, SyntheticApp], latency: float = 0.0, jitter: float = 0.0, seed: int = 0) -> None:
+        self.apps = apps
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._next_id = {app_id: app.size + 1 for app_id, app in apps.items()}
+        self._lock = threading.Lock()
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def streaming_transport(self) -> StreamingTransport:
+        """Transport that streams request bodies to the mock instead of reading them first"""
+        return StreamingTransport(self)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests += 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+        if (request.method, request.url.path) == ('POST', '/k/v1/file.json'):
+            return self._upload_file(request)
+
+        params = dict(request.url.params)
+        if request.content:
+            params.update(json.loads(request.content))
+
+        app = self.apps.get(int(params.get('app', 0)))
+        if app is None:
+            return self._error(404, 'GAIA_AP01', f"The specified app (id: {params.get('app')}) not found.")
+
+        # Long GET queries are sent as a POST with the method overridden
+        method = request.headers.get('X-HTTP-Method-Override', request.method)
+        route = (method, request.url.path)
+        if route == ('GET', '/k/v1/records.json'):
+            return self._get_records(app, params)
+        if route == ('POST', '/k/v1/records.json'):
+            return self._add_records(int(params['app']), params['records'])
+        if route == ('PUT', '/k/v1/records.json'):
+            return self._update_records(params['records'])
+        if route == ('GET', '/k/v1/app/form/fields.json'):
+            return httpx.Response(200, json={'properties': app.properties(), 'revision': '1'})
+
+        return self._error(404, 'CB_NO01', f'Unsupported mock endpoint {request.method} {request.url.path}')
+
+    def _get_records(self, app: SyntheticApp, params: dict[str, Any]) -> httpx.Response:
+        query = params.get('query', '')
+        cursor = int(m.group(1)) if (m := self._cursor.search(query)) else 0
+        limit = int(m.group(1)) if (m := self._limit.search(query)) else 100
+        offset = int(m.group(1)) if (m := self._offset.search(query)) else 0
+        if limit > 500:
+            return self._error(400, 'CB_VA01', 'limit must be 500 or less')
+
+        fields = params['fields'].split(',') if params.get('fields') else None
+
+        if m := self._in.search(query):
+            # Only `$id in (...)` can match, generated values are not indexed
+            ids = [int(v) for v in re.findall(r'\d+', m.group(2))] if m.group(1) == '$id' else []
+            ids = sorted(id for id in set(ids) if cursor < id <= app.size)
+        else:
+            ids = range(cursor + 1, app.size + 1)
+
+        body = {'records': [app.record(id, fields) for id in ids[offset:offset + limit]]}
+        if str(params.get('totalCount')).lower() == 'true':
+            body['totalCount'] = str(len(ids))
+        return httpx.Response(200, json=body)
+
+    def _add_records(self, app_id: int, records: list[dict]) -> httpx.Response:
+        if len(records) > 100:
+            return self._error(400, 'CB_VA01', 'records must be 100 or less')
+
+        with self._lock:
+            ids = list(range(self._next_id[app_id], self._next_id[app_id] + len(records)))
+            self._next_id[app_id] += len(records)
+        return httpx.Response(200, json={'ids': [str(id) for id in ids], 'revisions': ['1'] * len(ids)})
+
+    def _update_records(self, records: list[dict]) -> httpx.Response:
+        if len(records) > 100:
+            return self._error(400, 'CB_VA01', 'records must be 100 or less')
+
+        return httpx.Response(200, json={
+            'records': [{'id': str(record.get('id', i)), 'revision': '2'} for i, record in enumerate(records)]
+        })
+
+    def _upload_file(self, request: httpx.Request) -> httpx.Response:
+        # Consume the multipart body the way a network transport does, without keeping it on the request
+        size = sum(len(chunk) for chunk in request.stream)
+        with self._lock:
+            key = f'mock-file-{self.requests}-{size}'
+        return httpx.Response(200, json={'fileKey': key})
+
+    @staticmethod
+    def _error(status: int, code: str, message: str) -> httpx.Response:
+        return httpx.Response(status, json={'code': code, 'id': 'mock', 'message': message})
+
+class StreamingTransport(httpx.BaseTransport):
+    """Serves a `MockKintone` without reading request bodies up front, like a network transport
+
+    `httpx.MockTransport` reads every request body before calling the handler, which hides code
+    that reads `request.content` after a streamed upload.
+    """
+    def __init__(self, mock: MockKintone) -> None:
+        self.mock = mock
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.mock.handle(request)
@@ -0,0 +1,224 @@
+"""Benchmark suite for KinPy against the in-process mock Kintone server
+
+Reports throughput, p50/p99 latency and peak traced memory for record paging, bulk writes,
+form field retrieval, recorded file uploads and KTQueryable operations, and saves the results
+as JSON so runs can be compared across versions.
+
+Usage:
+    python benchmarks/run.py --sizes 10000 100000 1000000 --latency 0.02 --output results.json
+
+Note:
+    Peak memory is measured with tracemalloc, which slows Python allocations down,
+    compare timings between runs made with the same settings only
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Callable,
+)
+
+import argparse
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import kinpy
+from kinpy import KintonePortal, KintoneAuth, KTApp, Tracer, TrafficRecorder
+from kinpy.interfaces import KTQueryable
+from kinpy.models import App
+
+from mock_kintone import MockKintone, SyntheticApp, DefaultFieldMix
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def measure(name: str, size: int, func: Callable[[list[float]], int], memory: bool = True) -> dict[str, Any]:
+    """Run a benchmark case
+
+    Args:
+        name: Name of the case
+        size: Size of the dataset the case runs over
+        func: Runs the case, appends per-operation latencies to the list it is given
+            and returns the number of items processed
+        memory: Trace peak memory while running (default: True)
+    """
+    latencies: list[float] = []
+    if memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    items = func(latencies)
+    elapsed = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    result = {
+        'name': name,
+        'size': size,
+        'items': items,
+        'elapsed': elapsed,
+        'throughput': items / elapsed if elapsed else None,
+        'p50': percentile(latencies, 0.50),
+        'p99': percentile(latencies, 0.99),
+        'operations': len(latencies),
+        'peak_memory': peak,
+    }
+    print(f"{name:<24} size={size:<9} {result['throughput'] or 0:>12.1f} items/s  "
+          f"p50={result['p50'] * 1000:>8.2f}ms  p99={result['p99'] * 1000:>8.2f}ms  "
+          f"peak={(peak or 0) / 2**20:>8.1f}MiB")
+    return result
+
+def connect(mock: MockKintone, **opts) -> KintonePortal:
+    return KintonePortal('https://mock.kintone.com', KintoneAuth('token'), transport=mock.transport(), **opts)
+
+def span_timer(latencies: list[float], name: str) -> Tracer:
+    """Tracer that records the duration of every span called `name` (e.g. 'page' or 'request')"""
+    def collect(span):
+        if span.name == name:
+            latencies.append(span.duration)
+    return Tracer(collect)
+
+def bench_get_records(size: int, args: argparse.Namespace) -> dict[str, Any]:
+    mock = MockKintone({1: SyntheticApp(size, args.field_mix)}, latency=args.latency, jitter=args.jitter)
+    fields = list(SyntheticApp(0, args.field_mix).fields)
+
+    def run(latencies):
+        app = KTApp(connect(mock, tracer=span_timer(latencies, 'page')), 1)
+        return len(app.get_records(fields))
+    return measure('get_records', size, run, args.memory)
+
+def bench_upsert_records(size: int, args: argparse.Namespace) -> dict[str, Any]:
+    mock = MockKintone({1: SyntheticApp(0, args.field_mix)}, latency=args.latency, jitter=args.jitter)
+    rows = [{'code': f'key-{i}', 'number_0': i} for i in range(size)]
+
+    def run(latencies):
+        app = KTApp(connect(mock, max_concurrency=args.concurrency, tracer=span_timer(latencies, 'request')), 1)
+        result = app.upsert_records(rows, 'code')
+        return result['inserted'] + result['updated'] + result['unchanged']
+    return measure('upsert_records', size, run, args.memory)
+
+def bench_write_buffer(size: int, args: argparse.Namespace) -> dict[str, Any]:
+    mock = MockKintone({1: SyntheticApp(size, args.field_mix)}, latency=args.latency, jitter=args.jitter)
+
+    def run(latencies):
+        app = KTApp(connect(mock, tracer=span_timer(latencies, 'request')), 1)
+        with app.write_buffer(max_delay=None) as buffer:
+            # Two updates per record, coalesced into one
+            futures = [
+                buffer.update_record({'$id': id, field: value})
+                for id in range(1, size + 1)
+                for field, value in (('number_0', id), ('drop_down_0', 'Done'))
+            ]
+        for future in futures:
+            future.result()
+        return len(futures)
+    return measure('write_buffer', size, run, args.memory)
+
+def bench_get_form_fields(size: int, args: argparse.Namespace) -> dict[str, Any]:
+    mock = MockKintone({1: SyntheticApp(0, args.field_mix)}, latency=args.latency, jitter=args.jitter)
+    calls = 100
+
+    def run(latencies):
+        app = KTApp(connect(mock), 1)
+        for _ in range(calls):
+            start = time.perf_counter()
+            app.get_form_fields()
+            latencies.append(time.perf_counter() - start)
+        return calls
+    return measure('get_form_fields', calls, run, args.memory)
+
+def bench_upload_file(size: int, args: argparse.Namespace) -> dict[str, Any]:
+    mock = MockKintone({1: SyntheticApp(0, args.field_mix)}, latency=args.latency, jitter=args.jitter)
+    uploads = 20
+    data = os.urandom(size)
+
+    def run(latencies):
+        # Uploads are streamed and recorded, as with a network transport and a recorder attached
+        with tempfile.TemporaryDirectory() as tmp, TrafficRecorder(os.path.join(tmp, 'uploads.jsonl.gz')) as recorder:
+            portal = KintonePortal('https://mock.kintone.com', KintoneAuth('token'), transport=mock.streaming_transport(),
+                                   tracer=span_timer(latencies, 'request'), recorder=recorder)
+            app = KTApp(portal, 1)
+            for i in range(uploads):
+                app.upload_file(io.BytesIO(data), f'upload-{i}.bin')
+            if recorder.requests != uploads:
+                raise AssertionError(f'Recorded {recorder.requests} of {uploads} uploads')
+        return uploads * size
+    return measure('upload_file', size, run, args.memory)
+
+def bench_queryable(size: int, args: argparse.Namespace) -> dict[str, Any]:
+    apps = KTQueryable(App(appId=str(i), code=f'app-{i}', name=f'App {i % 100}', spaceId=str(i % 10)) for i in range(size))
+    operations = (
+        lambda: apps.select_where(spaceId='3'),
+        lambda: apps.query(lambda app: app.name.endswith('7')),
+        lambda: apps.take(100),
+        lambda: apps[size // 4:size // 2],
+        lambda: apps.select_where(code=f'app-{size - 1}').take(1),
+    )
+
+    def run(latencies):
+        for operation in operations:
+            start = time.perf_counter()
+            operation()
+            latencies.append(time.perf_counter() - start)
+        return len(operations) * size
+    return measure('ktqueryable', size, run, args.memory)
+
+Benchmarks: dict[str, Callable[[int, argparse.Namespace], dict[str, Any]]] = {
+    'get_records': bench_get_records,
+    'upsert_records': bench_upsert_records,
+    'write_buffer': bench_write_buffer,
+    'get_form_fields': bench_get_form_fields,
+    'upload_file': bench_upload_file,
+    'ktqueryable': bench_queryable,
+}
+
+# Benchmarks that do not depend on the dataset size only run once
+Unsized: set[str] = {'get_form_fields'}
+
+def main(argv: list[str] = None) -> dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--benchmarks', nargs='+', choices=list(Benchmarks), default=list(Benchmarks))
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every mock request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Maximum random seconds added on top of the latency')
+    parser.add_argument('--concurrency', type=int, default=4, help='Handler max_concurrency for concurrent paths')
+    parser.add_argument('--fields', type=json.loads, default=DefaultFieldMix, dest='field_mix',
+                        help='Field mix as JSON, e.g. \'{"SINGLE_LINE_TEXT": 10, "SUBTABLE": 1}\'')
+    parser.add_argument('--no-memory', action='store_false', dest='memory', help='Skip tracemalloc peak memory tracing')
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    results = [
+        Benchmarks[name](size, args)
+        for name in args.benchmarks
+        for size in (args.sizes[:1] if name in Unsized else args.sizes)
+    ]
+
+    report = {
+        'kinpy_version': kinpy.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'config': {k: v for k, v in vars(args).items() if k != 'output'},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Saved results to {args.output}')
+
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Startup benchmark for KinPy
+
+Measures the import time of common entry points with `python -X importtime`, in fresh interpreters,
+and fails when a scenario exceeds its budget, so cold starts of short-lived workers stay fast as
+routes and models are added.
+
+Usage:
+    python benchmarks/startup.py --runs 7 --output startup.json
+
+Note:
+    Only imports made by the scenario count, modules imported by interpreter startup
+    (`site` etc.) are excluded. The package is byte-compiled first, as deployed workers
+    import compiled modules. Budgets are in milliseconds and machine dependent,
+    scale them with `--scale` on slow machines.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+)
+
+import argparse
+import compileall
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Scenario -> (statement, budget in milliseconds)
+Scenarios: dict[str, tuple[str, float]] = {
+    'import': ('import kinpy', 10.0),
+    'query': ('from kinpy import QueryString', 30.0),
+    'portal': ('from kinpy import KintonePortal, KTApp, KintoneAuth', 250.0),
+    'records': ('from kinpy import KTRecord', 150.0),
+}
+
+def importtime(statement: str, env: dict[str, str]) -> dict[str, tuple[int, int]]:
+    """Run a statement in a fresh interpreter, return the (self, cumulative) microseconds of its top-level imports"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module importing them
+        imports[name[1:].rstrip()] = (int(self_us), int(cumulative_us))
+    return imports
+
+def measure(statement: str, runs: int, env: dict[str, str]) -> dict[str, Any]:
+    baseline = {name.strip() for name in importtime('pass', env)}
+    totals = []
+    modules: dict[str, list[int]] = {}
+    for _ in range(runs):
+        imports = {name: times for name, times in importtime(statement, env).items() if name.strip() not in baseline}
+        totals.append(sum(cumulative for name, (_, cumulative) in imports.items() if not name.startswith(' ')) / 1000)
+        for name, (self_us, _) in imports.items():
+            modules.setdefault(name.strip(), []).append(self_us)
+
+    slowest = sorted(((statistics.median(times) / 1000, name) for name, times in modules.items()), reverse=True)[:10]
+    return {
+        'median_ms': statistics.median(totals),
+        'min_ms': min(totals),
+        'max_ms': max(totals),
+        'modules': len(modules),
+        'slowest': [{'module': name, 'self_ms': ms} for ms, name in slowest],
+    }
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', choices=list(Scenarios), default=list(Scenarios))
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per scenario, the median is reported')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget')
+    parser.add_argument('--verbose', action='store_true', help='Print the slowest modules of each scenario')
+    parser.add_argument('--output', default=None, help='Save the results as JSON')
+    args = parser.parse_args(argv)
+
+    # Import the working tree, not an installed copy
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [src, os.environ.get('PYTHONPATH')]))}
+    compileall.compile_dir(os.path.join(src, 'kinpy'), quiet=1)
+
+    results = {}
+    failed = False
+    for name in args.scenarios:
+        statement, budget = Scenarios[name]
+        result = measure(statement, args.runs, env)
+        result.update(statement=statement, budget_ms=budget * args.scale)
+        result['passed'] = result['median_ms'] <= result['budget_ms']
+        failed |= not result['passed']
+        results[name] = result
+
+        print(f"{name:<10} {result['median_ms']:>8.1f}ms  budget={result['budget_ms']:>7.1f}ms  "
+              f"{'ok' if result['passed'] else 'OVER BUDGET'}  ({statement})")
+        if args.verbose or not result['passed']:
+            for module in result['slowest']:
+                print(f"    {module['self_ms']:>8.2f}ms  {module['module']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version, 'results': results}, f, indent=2)
+        print(f'Saved results to {args.output}')
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
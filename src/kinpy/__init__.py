@@ -1,16 +1,68 @@
 """A Python interface for the Kintone REST API"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import importlib
 
 __version__ = '0.0.1'
 
-from .utils import QueryString
+# Public names are imported from their modules on first access, so `import kinpy`
+# stays cheap for short-lived processes that only use part of the package
+_Exports: dict[str, str] = {
+    'QueryString': '.utils',
+    'compile_query': '.query',
+    'parse_query': '.query',
+    # Kintone Auth is required for initialization of the Kintone interface
+    'KintoneAuth': '.handlers',
+    'KintoneAPIError': '.handlers',
+    # Add interfaces as they are defined
+    'KintonePortal': '.interfaces',
+    'KTApp': '.interfaces',
+    'KTRecord': '.records',
+    'WriteBuffer': '.buffers',
+    'Metrics': '.metrics',
+    'Tracer': '.tracing',
+    'SpanCollector': '.tracing',
+    'MemoryProfiler': '.profiling',
+    'deadline': '.deadlines',
+    'DeadlineExceeded': '.deadlines',
+    'HedgePolicy': '.deadlines',
+    'AdaptiveConcurrency': '.concurrency',
+    'TrafficRecorder': '.recording',
+    'ReplayTransport': '.recording',
+    'Snapshot': '.snapshot',
+    'Spool': '.spool',
+    'SpoolWriter': '.spool',
+    'RecordCoercer': '.coercion',
+}
+
+__all__ = list(_Exports)
+
+def __getattr__(name: str):
+    if name not in _Exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_Exports[name], __name__), name)
+    # Cache on the package so the next access skips __getattr__
+    globals()[name] = value
+    return value
 
-# Kintone Auth is required for initialization of the Kintone interface
-from .handlers import KintoneAuth
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_Exports})
 
-# Uncomment as interfaces are defined
-from .interfaces import (
-   KintonePortal,
-   KTApp,
-#    KTRecord,
-#    KTField,
-)
\ No newline at end of file
+if TYPE_CHECKING:
+    from .utils import QueryString
+    from .query import compile_query, parse_query
+    from .handlers import KintoneAuth, KintoneAPIError
+    from .interfaces import KintonePortal, KTApp
+    from .records import KTRecord
+    from .buffers import WriteBuffer
+    from .metrics import Metrics
+    from .tracing import Tracer, SpanCollector
+    from .profiling import MemoryProfiler
+    from .deadlines import deadline, DeadlineExceeded, HedgePolicy
+    from .concurrency import AdaptiveConcurrency
+    from .recording import TrafficRecorder, ReplayTransport
+    from .snapshot import Snapshot
+    from .spool import Spool, SpoolWriter
+    from .coercion import RecordCoercer
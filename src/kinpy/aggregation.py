@@ -0,0 +1,193 @@
+"""Module for aggregating records page by page
+
+Pages are folded into running accumulators as they arrive and then discarded,
+so aggregating an app takes memory proportional to the number of groups, not records.
+Pages are folded with NumPy when it is installed.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Iterable,
+)
+from math import inf, isnan
+
+import functools
+
+@functools.cache
+def _numpy():
+    """NumPy if it is installed, imported on first use as it is slow to import"""
+    try:
+        import numpy
+    except ImportError: # NumPy is optional
+        return None
+    return numpy
+
+# Aggregate functions, 'count' without a field counts records, with a field it counts non-empty values
+AggregateFunctions: tuple[str, ...] = ('count', 'sum', 'mean', 'min', 'max')
+
+def _metric(name: str, spec: str | tuple[str, str]) -> tuple[str, str | None]:
+    function, field = (spec, None) if isinstance(spec, str) else spec
+    if function not in AggregateFunctions:
+        raise ValueError(f"Unknown aggregate function {function} for metric {name}, expected one of {AggregateFunctions}")
+    if field is None and function != 'count':
+        raise ValueError(f"Metric {name} needs a field to {function}")
+    return function, field
+
+def _group_value(value: Any) -> Any:
+    """Hashable group key of a field value (lists become tuples, users/orgs/groups their code)"""
+    if isinstance(value, dict):
+        return value.get('code', str(value))
+    if isinstance(value, list):
+        return tuple(_group_value(v) for v in value)
+    return value
+
+def _number(value: Any) -> float:
+    if value in (None, ''):
+        return float('nan')
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def _column(records: list[dict[str, Any]], field: str):
+    """Values of a field as a float64 array, empty and non-numeric values as NaN"""
+    np = _numpy()
+    values = [record.get(field) for record in records]
+    try:
+        # The column is parsed by NumPy in one call, empty values become 'nan' (falsy numbers are kept)
+        return np.asarray([value or ('nan' if value is None or value == '' else value) for value in values], dtype=float)
+    except (TypeError, ValueError): # Non-numeric values, parse them one by one
+        return np.array([_number(value) for value in values], dtype=float)
+
+class Aggregation:
+    """Running group-by aggregation over pages of records
+
+    Args:
+        group_by: Field codes to group by (none aggregates all records into a single group)
+        metrics: Metric name to aggregate function, either `'count'` or a `(function, field)` tuple
+
+    Example:
+        >>> aggregation = Aggregation(['Status'], {'n': 'count', 'total': ('sum', 'Amount')})
+        >>> aggregation.add([{'Status': 'Open', 'Amount': '10'}, {'Status': 'Open', 'Amount': '5'}])
+        >>> aggregation.result()
+        {'Open': {'n': 2, 'total': 15.0}}
+    """
+    def __init__(self, group_by: list[str], metrics: dict[str, str | tuple[str, str]]) -> None:
+        self.group_by = list(group_by)
+        self.metrics = {name: _metric(name, spec) for name, spec in metrics.items()}
+        self.value_fields = list(dict.fromkeys(field for _, field in self.metrics.values() if field))
+        # Group key -> record count, and per value field [count, sum, min, max]
+        self.counts: dict[Any, int] = {}
+        self.values: dict[Any, dict[str, list[float]]] = {}
+
+    @property
+    def fields(self) -> list[str]:
+        """Field codes the aggregation needs fetched"""
+        return list(dict.fromkeys(self.group_by + self.value_fields))
+
+    def _key(self, record: dict[str, Any]) -> Any:
+        if not self.group_by:
+            return None
+        if len(self.group_by) == 1:
+            return _group_value(record.get(self.group_by[0]))
+        return tuple(_group_value(record.get(field)) for field in self.group_by)
+
+    def _state(self, key: Any) -> dict[str, list[float]]:
+        if key not in self.values:
+            self.counts[key] = 0
+            self.values[key] = {field: [0, 0.0, inf, -inf] for field in self.value_fields}
+        return self.values[key]
+
+    def add(self, records: Iterable[dict[str, Any]]) -> None:
+        """Fold a page of records into the accumulators"""
+        records = records if isinstance(records, list) else list(records)
+        if not records:
+            return
+        if _numpy() is not None:
+            return self._add_numpy(records)
+
+        for record in records:
+            key = self._key(record)
+            state = self._state(key)
+            self.counts[key] += 1
+            for field in self.value_fields:
+                value = _number(record.get(field))
+                if isnan(value):
+                    continue
+                acc = state[field]
+                acc[0] += 1
+                acc[1] += value
+                acc[2] = min(acc[2], value)
+                acc[3] = max(acc[3], value)
+
+    def _add_numpy(self, records: list[dict[str, Any]]) -> None:
+        np = _numpy()
+        index: dict[Any, int] = {}
+        inverse = np.fromiter((index.setdefault(self._key(record), len(index)) for record in records), dtype=np.intp, count=len(records))
+        keys = list(index)
+        groups = len(keys)
+
+        counts = np.bincount(inverse, minlength=groups)
+        columns = {}
+        for field in self.value_fields:
+            values = _column(records, field)
+            present = ~np.isnan(values)
+            if groups == 1:
+                n = int(np.count_nonzero(present))
+                columns[field] = (
+                    [n],
+                    [np.nansum(values)],
+                    [np.nanmin(values) if n else inf],
+                    [np.nanmax(values) if n else -inf],
+                )
+                continue
+
+            groups_present, values = inverse[present], values[present]
+
+            mins = np.full(groups, inf)
+            maxs = np.full(groups, -inf)
+            np.minimum.at(mins, groups_present, values)
+            np.maximum.at(maxs, groups_present, values)
+            columns[field] = (
+                np.bincount(groups_present, minlength=groups),
+                np.bincount(groups_present, weights=values, minlength=groups),
+                mins,
+                maxs,
+            )
+
+        for i, key in enumerate(keys):
+            state = self._state(key)
+            self.counts[key] += int(counts[i])
+            for field, (n, sums, mins, maxs) in columns.items():
+                acc = state[field]
+                acc[0] += int(n[i])
+                acc[1] += float(sums[i])
+                acc[2] = min(acc[2], float(mins[i]))
+                acc[3] = max(acc[3], float(maxs[i]))
+
+    def _evaluate(self, key: Any) -> dict[str, Any]:
+        result = {}
+        for name, (function, field) in self.metrics.items():
+            if field is None:
+                result[name] = self.counts[key]
+                continue
+
+            n, total, low, high = self.values[key][field]
+            result[name] = {
+                'count': n,
+                'sum': total,
+                'mean': total / n if n else None,
+                'min': low if n else None,
+                'max': high if n else None,
+            }[function]
+        return result
+
+    def result(self) -> dict[Any, dict[str, Any]] | dict[str, Any]:
+        """Metrics by group key (a tuple when grouping by several fields),
+        or the metrics of all records when not grouping"""
+        if not self.group_by:
+            if not self.counts:
+                self._state(None)
+            return self._evaluate(None)
+        return {key: self._evaluate(key) for key in self.counts}
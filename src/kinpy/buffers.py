@@ -0,0 +1,146 @@
+"""Module for buffering record writes before they are sent to the Kintone REST API"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    TYPE_CHECKING,
+)
+from concurrent.futures import Future
+
+import threading
+
+from .handlers import KintoneAPIError
+
+if TYPE_CHECKING:
+    from .interfaces import KTApp
+
+class WriteBuffer:
+    """Write-behind buffer that coalesces record updates into bulk requests
+
+    Updates are merged per `$id` (the last write to a field wins) and sent as batched
+    `PUT /k/v1/records.json` requests once `max_records` distinct records are pending,
+    `max_delay` seconds after the first pending update, on `flush()` or when the context exits.
+
+    Args:
+        app: The app the records belong to
+        max_records: Number of distinct pending records that triggers a flush (default: 100)
+        max_delay: Seconds to wait before flushing pending updates, None disables timed flushes (default: 1.0)
+
+    Example:
+        >>> with app.write_buffer() as buffer:
+        ...     first = buffer.update_record({'$id': '1', 'Status': 'Open'})
+        ...     second = buffer.update_record({'$id': '1', 'Owner': 'Alice'})
+        >>> first.result() # Both updates were sent as a single record
+        {'id': '1', 'revision': '5'}
+    """
+    # Maximum records accepted by a single bulk update request
+    batch_size = 100
+
+    def __init__(self, app: KTApp, max_records: int = 100, max_delay: float | None = 1.0) -> None:
+        self.app = app
+        self.max_records = max_records
+        self.max_delay = max_delay
+
+        # {record_id: (merged fields, futures waiting on the record)}
+        self._pending: dict[str, tuple[dict[str, Any], list[Future]]] = {}
+        self._lock = threading.Lock()
+        # Batches are sent one at a time so a later write can never overtake an earlier one
+        self._send_lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self._closed = False
+
+    def update_record(self, record: dict[str, Any]) -> Future:
+        """Buffer an update for the specified record ($id needs to be specified)
+
+        Returns:
+            Future: Resolves to the record's `{'id', 'revision'}` once the update is sent,
+                or raises a `KintoneAPIError` if the batch containing it was rejected
+        """
+        if self._closed:
+            raise RuntimeError("Cannot update records through a closed WriteBuffer")
+        if '$id' not in record:
+            raise ValueError("Buffered updates require the record `$id`")
+
+        future = Future()
+        record_id = str(record['$id'])
+
+        with self._lock:
+            fields, futures = self._pending.setdefault(record_id, ({}, []))
+            fields.update((k, v) for k, v in record.items() if k != '$id')
+            futures.append(future)
+
+            flush_now = len(self._pending) >= self.max_records
+            if not flush_now and self._timer is None and self.max_delay is not None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if flush_now:
+            self.flush()
+
+        return future
+
+    def flush(self) -> None:
+        """Send all pending updates
+
+        Note:
+            Failures are reported through the futures returned by `update_record`, never raised here
+        """
+        # Taking the pending updates and sending them is one step, a flush that took its updates
+        # later can't send them before this one
+        with self._send_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+
+            items = list(pending.items())
+            for i in range(0, len(items), self.batch_size):
+                self._send_batch(items[i:i + self.batch_size])
+
+    def close(self) -> None:
+        """Flush pending updates and stop accepting new ones"""
+        self._closed = True
+        self.flush()
+
+    def _send_batch(self, batch: list[tuple[str, tuple[dict[str, Any], list[Future]]]]) -> None:
+        # Re-structure records in API-friendly format
+        records = [
+            {
+                'id': record_id,
+                'record': {k: {'value': v} for k, v in fields.items()},
+            }
+            for record_id, (fields, _) in batch
+        ]
+
+        try:
+            route = self.app._portal.routes.update_records(app=self.app.app_id, records=records)
+            response = route()
+            if not response.is_success:
+                raise KintoneAPIError(response)
+            results = {
+                str(result['id']): result
+                for result in response.json()['records']
+            }
+        except Exception as e:
+            for _, (_, futures) in batch:
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        for record_id, (_, futures) in batch:
+            for future in futures:
+                future.set_result(results.get(record_id))
+
+    def __enter__(self) -> WriteBuffer:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __repr__(self):
+        return f'<WriteBuffer app={self.app.app_id} pending={len(self)}>'
@@ -0,0 +1,237 @@
+"""Module for the cached catalog of the Apps of a portal
+
+The catalog pages `apps.json` concurrently and indexes the Apps by ID, code, name and space,
+so resolving an App code to its ID is a dictionary lookup instead of a request.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Iterator,
+    TYPE_CHECKING,
+)
+from dataclasses import fields as dataclass_fields
+
+import json
+import threading
+import time
+
+from .handlers import HTTPX_Sync, KintoneAPIError
+
+if TYPE_CHECKING:
+    from .interfaces import KintonePortal, KTApp, KTQueryable
+    from .models import App
+
+def _decode_app(app: dict[str, Any]) -> App:
+    """Decode an App from `apps.json`, ignoring keys the model does not define"""
+    # Models are imported on first use to keep `import kinpy` fast
+    from .models import App, UserId
+
+    values = {key: value for key, value in app.items() if key in {field.name for field in dataclass_fields(App)}}
+    for key in ('creator', 'modifier'):
+        if isinstance(values.get(key), dict):
+            user_fields = {field.name for field in dataclass_fields(UserId)}
+            values[key] = UserId(**{k: v for k, v in values[key].items() if k in user_fields})
+    return App(**values)
+
+class AppCatalog:
+    """Cached index of the Apps of a portal
+
+    Args:
+        portal: Portal to list the Apps of (requires a Sync Handler and user/pass auth)
+        ttl: Seconds before the catalog is fully reloaded on the next access, None to never expire (default: 300)
+        page_size: Apps per `apps.json` request (default: 100, the API maximum)
+        concurrent_pages: Pages requested at once while paging (default: 4)
+
+    Note:
+        Lookups that miss the cache fetch the missing App by ID or code in a single request,
+        keys that match no App are not looked up again until the next `update()` or reload.
+        `update()` fetches Apps created since the last load without reloading the catalog
+
+    Example:
+        >>> kintone.apps['orders'].appId
+        '42'
+        >>> kintone.apps.app_id('orders')
+        '42'
+        >>> kintone.apps.in_space(7)
+        [App(appId='42', code='orders', ...), ...]
+    """
+    def __init__(self, portal: KintonePortal, ttl: float | None = 300.0, page_size: int = 100, concurrent_pages: int = 4) -> None:
+        if not isinstance(portal.handler, HTTPX_Sync):
+            raise AttributeError("App catalog requires a Sync Handler")
+
+        self._portal = portal
+        self.ttl = ttl
+        self.page_size = page_size
+        self.concurrent_pages = concurrent_pages
+        self.loaded_at: float | None = None
+        # Apps in the listing when it was last paged, Apps fetched one at a time are not counted
+        self._listed = 0
+        # Keys that matched no App when fetched, cleared when the listing is paged again
+        self._missing: set[str] = set()
+
+        self._by_id: dict[str, App] = {}
+        self._by_code: dict[str, App] = {}
+        self._by_name: dict[str, list[App]] = {}
+        self._by_space: dict[str, list[App]] = {}
+        self._lock = threading.RLock()
+
+    def _get_page(self, **params) -> list[App]:
+        response = self._portal.routes.get_apps(**params)()
+        body: dict = json.loads(response.content)
+        if 'apps' not in body:
+            raise KintoneAPIError(response)
+        return [_decode_app(app) for app in body['apps']]
+
+    def _page(self, start: int) -> Iterator[App]:
+        """Fetch the Apps from offset `start` to the end, `concurrent_pages` pages at a time"""
+        handler = self._portal.handler
+        offset = start
+        while True:
+            offsets = [offset + i * self.page_size for i in range(self.concurrent_pages)]
+            pages = handler.map(lambda offset: self._get_page(limit=self.page_size, offset=offset), offsets)
+            for page in pages:
+                yield from page
+                if len(page) < self.page_size:
+                    return
+            offset = offsets[-1] + self.page_size
+
+    def _add(self, app: App) -> None:
+        old = self._by_id.get(app.appId)
+        if old is not None:
+            self._remove(old)
+        self._by_id[app.appId] = app
+        if app.code:
+            self._by_code[app.code] = app
+        self._by_name.setdefault(app.name, []).append(app)
+        self._by_space.setdefault(app.spaceId, []).append(app)
+
+    def _remove(self, app: App) -> None:
+        self._by_id.pop(app.appId, None)
+        if app.code and self._by_code.get(app.code) is app:
+            del self._by_code[app.code]
+        for index, key in ((self._by_name, app.name), (self._by_space, app.spaceId)):
+            apps = [other for other in index.get(key, []) if other is not app]
+            if apps:
+                index[key] = apps
+            else:
+                index.pop(key, None)
+
+    def refresh(self) -> None:
+        """Reload the whole catalog
+
+        Raises:
+            KintoneAPIError: If a page request fails (the previous catalog is kept)
+        """
+        apps = list(self._page(0))
+        with self._lock:
+            self._by_id.clear()
+            self._by_code.clear()
+            self._by_name.clear()
+            self._by_space.clear()
+            for app in apps:
+                self._add(app)
+            self._listed = len(apps)
+            self._missing.clear()
+            self.loaded_at = time.monotonic()
+
+    def update(self) -> int:
+        """Fetch the Apps created since the catalog was loaded
+
+        Apps are listed in order of ID, so only the pages from the one before the last partially filled
+        one onward are fetched, which covers up to a page of Apps deleted since the last load.
+        Deleted or changed Apps are picked up by the next `refresh()`.
+
+        Returns:
+            int: Number of Apps added
+        """
+        if self.loaded_at is None:
+            self.refresh()
+            return len(self._by_id)
+
+        with self._lock:
+            start = max(0, self._listed - self._listed % self.page_size - self.page_size)
+            listed = added = 0
+            for app in self._page(start):
+                listed += 1
+                added += app.appId not in self._by_id
+                self._add(app)
+            self._listed = start + listed
+            self._missing.clear()
+            return added
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            expired = self.ttl is not None and self.loaded_at is not None and time.monotonic() - self.loaded_at > self.ttl
+            if self.loaded_at is None or expired:
+                self.refresh()
+
+    def _fetch(self, key: str) -> App | None:
+        """Look up a single App missing from the catalog by ID or code"""
+        with self._lock:
+            if key in self._missing:
+                return None
+        params = {'ids': [key]} if key.isdigit() else {'codes': [key]}
+        try:
+            apps = self._get_page(**params)
+        except KintoneAPIError:
+            return None
+        with self._lock:
+            for app in apps:
+                self._add(app)
+            if not apps:
+                self._missing.add(key)
+        return apps[0] if apps else None
+
+    def get(self, key: int | str, default: Any = None) -> App | None:
+        """Get an App by ID, code or (unique) name"""
+        self._ensure_loaded()
+        key = str(key)
+        with self._lock:
+            app = self._by_id.get(key) or self._by_code.get(key)
+            if app is None and len(self._by_name.get(key, [])) == 1:
+                app = self._by_name[key][0]
+        if app is None:
+            app = self._fetch(key)
+        return default if app is None else app
+
+    def __getitem__(self, key: int | str) -> App:
+        app = self.get(key)
+        if app is None:
+            raise KeyError(key)
+        return app
+
+    def __contains__(self, key: int | str) -> bool:
+        return self.get(key) is not None
+
+    def app_id(self, key: int | str) -> str:
+        """Resolve an App code (or name) to its ID"""
+        return self[key].appId
+
+    def named(self, name: str) -> KTQueryable:
+        """Get all Apps with the exact name"""
+        from .interfaces import KTQueryable
+        self._ensure_loaded()
+        return KTQueryable(self._by_name.get(name, []))
+
+    def in_space(self, space_id: int | str | None) -> KTQueryable:
+        """Get the Apps of a space (None for Apps outside spaces)"""
+        from .interfaces import KTQueryable
+        self._ensure_loaded()
+        return KTQueryable(self._by_space.get(None if space_id is None else str(space_id), []))
+
+    def connect(self, key: int | str) -> KTApp:
+        """Get the App interface of an App by ID, code or name"""
+        from .interfaces import KTApp
+        return KTApp(self._portal, self.app_id(key))
+
+    def __iter__(self) -> Iterator[App]:
+        self._ensure_loaded()
+        return iter(list(self._by_id.values()))
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._by_id)
+
+    def __repr__(self):
+        return f'<AppCatalog apps={len(self._by_id)} loaded_at={self.loaded_at}>'
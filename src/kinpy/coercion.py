@@ -0,0 +1,241 @@
+"""Module for converting record values from their API strings to Python types
+
+The API returns numbers, dates and times as strings. A `RecordCoercer` looks up the type of each
+field (through `fields.FieldTypeMap` and the App's form) once, picks a converter per column, and
+compiles a row converter for the typed columns of a page. Text, choice and user fields are never
+touched. Pages can also be converted to columns, as NumPy arrays when NumPy is installed.
+
+Converted values (empty values become None, or NaN/NaT in arrays):
+
+    NUMBER, CALC (number formats)        float       float64
+    $id, $revision                       int         int64
+    DATETIME, CREATED_TIME, UPDATED_TIME datetime    datetime64[s] (UTC)
+    DATE                                 date        datetime64[D]
+    TIME                                 time        (list of time)
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    TYPE_CHECKING,
+)
+from datetime import date, datetime, time
+
+from .aggregation import _numpy
+from .models.fields import (
+    FieldTypeMap,
+    Field,
+    RecordId,
+    Revision,
+    Number,
+    Calculated,
+    CreatedDatetime,
+    UpdatedDatetime,
+    Date,
+    DateAndTime,
+    Time,
+)
+
+if TYPE_CHECKING:
+    from .interfaces import KTApp
+
+# Field class -> kind of value, fields of other classes are passed through unchanged
+ValueKinds: dict[type[Field], str] = {
+    RecordId: 'int',
+    Revision: 'int',
+    Number: 'number',
+    CreatedDatetime: 'datetime',
+    UpdatedDatetime: 'datetime',
+    DateAndTime: 'datetime',
+    Date: 'date',
+    Time: 'time',
+}
+
+# CALC format -> kind of value (durations are returned as text and passed through)
+CalcFormatKinds: dict[str, str] = {
+    'NUMBER': 'number',
+    'NUMBER_DIGIT': 'number',
+    'DATETIME': 'datetime',
+    'DATE': 'date',
+    'TIME': 'time',
+}
+
+# Fields every record has, whether or not they were requested from the form
+_RecordKeys: dict[str, str] = {'$id': 'int', '$revision': 'int'}
+
+# Per-value converters, used by the compiled row converters
+CellConverters: dict[str, Callable[[str], Any]] = {
+    'number': float,
+    'int': int,
+    'datetime': datetime.fromisoformat,
+    'date': date.fromisoformat,
+    'time': time.fromisoformat,
+}
+
+def _compile_rows(columns: list[tuple[str, str]]) -> Callable[[list[dict[str, Any]]], None]:
+    """Compile a function converting the columns of every record in place
+
+    The loop is unrolled over the columns, so each value costs one lookup, one call and one store.
+    Field codes and converters are bound as names, never written into the source.
+    """
+    namespace: dict[str, Any] = {}
+    lines = ['def convert(records):', '    for record in records:']
+    for i, (code, kind) in enumerate(columns):
+        namespace[f'k{i}'] = code
+        namespace[f'c{i}'] = CellConverters[kind]
+        lines.append(f'        v = record[k{i}]; record[k{i}] = c{i}(v) if v else None')
+    exec('\n'.join(lines), namespace)
+    return namespace['convert']
+
+def _floats(values: list) -> list:
+    return [float(v) if v else None for v in values]
+
+def _ints(values: list) -> list:
+    return [int(v) if v else None for v in values]
+
+def _datetimes(values: list) -> list:
+    return [datetime.fromisoformat(v) if v else None for v in values]
+
+def _dates(values: list) -> list:
+    return [date.fromisoformat(v) if v else None for v in values]
+
+def _times(values: list) -> list:
+    return [time.fromisoformat(v) if v else None for v in values]
+
+def _array_floats(values: list):
+    return _numpy().array([v or 'nan' for v in values], dtype='float64')
+
+def _array_ints(values: list):
+    # Ids are never empty, fall back to floats (NaN) for columns that are
+    if all(values):
+        return _numpy().array(values, dtype='int64')
+    return _array_floats(values)
+
+def _array_datetimes(values: list):
+    # Values are UTC, NumPy does not parse the 'Z' suffix
+    return _numpy().array(['NaT' if not v else v[:-1] if v.endswith('Z') else v for v in values], dtype='datetime64[s]')
+
+def _array_dates(values: list):
+    return _numpy().array([v or 'NaT' for v in values], dtype='datetime64[D]')
+
+Converters: dict[str, Callable[[list], list]] = {
+    'number': _floats,
+    'int': _ints,
+    'datetime': _datetimes,
+    'date': _dates,
+    'time': _times,
+}
+
+ArrayConverters: dict[str, Callable[[list], Any]] = {
+    'number': _array_floats,
+    'int': _array_ints,
+    'datetime': _array_datetimes,
+    'date': _array_dates,
+    'time': _times, # NumPy has no time of day type
+}
+
+def value_kind(field_type: str, properties: dict[str, Any] = None) -> str | None:
+    """Kind of value of a field type (None for fields that are passed through)
+
+    Args:
+        field_type: Field type as returned by the API (e.g. 'NUMBER')
+        properties: Field properties from the form, used for the format of CALC fields (optional)
+    """
+    cls = FieldTypeMap.get(field_type)
+    if cls is Calculated:
+        return CalcFormatKinds.get((properties or {}).get('format', 'NUMBER'))
+    return ValueKinds.get(cls)
+
+class RecordCoercer:
+    """Converts pages of records to typed values
+
+    Args:
+        properties: Field code to field properties (`get_form_fields()['properties']`) or to field type
+
+    Example:
+        >>> coercer = RecordCoercer.from_app(app)
+        >>> for page in app.iter_record_pages(['Amount', 'Ordered']):
+        ...     coercer.coerce(page)
+        ...     page[0]['Amount'], page[0]['Ordered']
+        (12.5, datetime.datetime(2024, 6, 1, 9, 30, tzinfo=datetime.timezone.utc))
+        >>> coercer.columns(page)['Amount']  # With NumPy installed
+        array([12.5, nan, 3. ])
+    """
+    def __init__(self, properties: dict[str, dict[str, Any] | str]) -> None:
+        self.kinds: dict[str, str] = dict(_RecordKeys)
+        for code, field in properties.items():
+            field_type, props = (field, None) if isinstance(field, str) else (field.get('type'), field)
+            kind = value_kind(field_type, props)
+            if kind is not None:
+                self.kinds[code] = kind
+        # Compiled row converters by the typed columns of a page
+        self._compiled: dict[tuple[tuple[str, str], ...], Callable[[list[dict[str, Any]]], None]] = {}
+
+    @classmethod
+    def from_app(cls, app: KTApp) -> RecordCoercer:
+        """Build a coercer from the form of an App
+
+        Raises:
+            ValueError: If the form fields can't be fetched
+        """
+        form = app.get_form_fields()
+        if form is None:
+            raise ValueError(f"Could not get the form fields of app {app.app_id}")
+        return cls(form['properties'])
+
+    def _present(self, records: list[dict[str, Any]]) -> list[tuple[str, str]]:
+        """Typed columns of the page (only fields that were fetched)
+
+        Pages are uniform, every record of a page has the fields that were requested,
+        so the first record stands for the whole page.
+        """
+        first = records[0]
+        return [(code, kind) for code, kind in self.kinds.items() if code in first]
+
+    def coerce(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Convert the typed fields of a page of records (as fetched, not yet converted) in place
+
+        Args:
+            records: Page of records, every record must have the same fields
+
+        Returns:
+            list: The same records
+        """
+        if not records:
+            return records
+        columns = tuple(self._present(records))
+        if not columns:
+            return records # Only untyped fields, nothing to convert
+        convert = self._compiled.get(columns)
+        if convert is None:
+            convert = self._compiled[columns] = _compile_rows(list(columns))
+        convert(records)
+        return records
+
+    def columns(self, records: list[dict[str, Any]], arrays: bool = True) -> dict[str, Any]:
+        """Convert a page of records to columns, field code to values
+
+        Args:
+            records: Page of records, every record must have the same fields
+            arrays: Return typed columns as NumPy arrays when NumPy is installed (default: True)
+
+        Returns:
+            dict: Typed columns as arrays (or lists), other columns as lists of the values as fetched
+        """
+        if not records:
+            return {}
+        converters = ArrayConverters if arrays and _numpy() is not None else Converters
+        columns = {code: [record[code] for record in records] for code in records[0]}
+        for code, kind in self._present(records):
+            columns[code] = converters[kind](columns[code])
+        return columns
+
+    def iter_pages(self, pages: Iterable[list[dict[str, Any]]]) -> Iterable[list[dict[str, Any]]]:
+        """Convert pages as they are yielded"""
+        for page in pages:
+            yield self.coerce(page)
+
+    def __repr__(self):
+        return f'<RecordCoercer typed={len(self.kinds)}>'
@@ -0,0 +1,215 @@
+"""Module for limiting and adapting the number of requests in flight
+
+Handlers hold a slot of a `Limiter` for every request. With an `AdaptiveConcurrency` policy the
+limit follows an AIMD (additive increase, multiplicative decrease) rule: it grows by one slot per
+round of successful requests while the limit is saturated, and is cut when Kintone throttles
+(429/503), requests time out, or latency rises well above the endpoint's baseline, so long jobs
+settle at the highest rate the portal sustains.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+
+import asyncio
+import threading
+import time
+
+from .metrics import ThrottleStatusCodes
+
+@dataclass
+class AdaptiveConcurrency:
+    """AIMD policy for the number of requests a handler keeps in flight
+
+    The handler's `max_concurrency` is the starting limit.
+
+    Args:
+        min_limit: Lowest limit (default: 1)
+        max_limit: Highest limit (default: 32)
+        backoff: Factor the limit is multiplied by on congestion (default: 0.5)
+        latency_tolerance: Latency above this multiple of the endpoint's baseline counts as congestion (default: 2.0)
+        min_samples: Requests to an endpoint before its latency is judged (default: 10)
+        baseline_drift: Weight of each sample above the baseline, lets the baseline follow
+            lasting latency changes (default: 0.01)
+
+    Attributes:
+        limit: Current limit, fractional as it grows by `1 / limit` per success
+        increases: Times the limit grew by a whole slot
+        decreases: Times the limit was cut
+
+    Example:
+        >>> kintone = KintonePortal('https://example.kintone.com', auth, max_concurrency=4,
+        ...                         adaptive=AdaptiveConcurrency(max_limit=16), metrics=metrics)
+        >>> metrics.gauges()['concurrency_limit']
+        9
+    """
+    min_limit: int = 1
+    max_limit: int = 32
+    backoff: float = 0.5
+    latency_tolerance: float = 2.0
+    min_samples: int = 10
+    baseline_drift: float = 0.01
+    limit: float = field(default=0.0, init=False)
+    increases: int = field(default=0, init=False)
+    decreases: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        if not 1 <= self.min_limit <= self.max_limit:
+            raise ValueError(f"Expected 1 <= min_limit <= max_limit, got {self.min_limit} and {self.max_limit}")
+        if not 0 < self.backoff < 1:
+            raise ValueError(f"Backoff must be between 0 and 1, got {self.backoff}")
+        self._baselines: dict[str, tuple[float, int]] = {}
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def start(self, initial: int) -> None:
+        """Set the starting limit, unless the policy is already in use"""
+        with self._lock:
+            if not self.limit:
+                self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+
+    @property
+    def current(self) -> int:
+        """Current limit in whole requests"""
+        return int(self.limit)
+
+    def _congested(self, endpoint: str, latency: float, status_code: int | None) -> bool:
+        if status_code is None or status_code in ThrottleStatusCodes:
+            return True
+
+        baseline, samples = self._baselines.get(endpoint, (latency, 0))
+        if latency < baseline:
+            baseline = latency
+        else:
+            baseline += (latency - baseline) * self.baseline_drift
+        self._baselines[endpoint] = (baseline, samples + 1)
+        return samples >= self.min_samples and latency > self.latency_tolerance * baseline
+
+    def observe(self, endpoint: str, start: float, latency: float, status_code: int | None, in_flight: int) -> bool:
+        """Adjust the limit after a request
+
+        Args:
+            endpoint: Path of the request
+            start: `time.perf_counter()` when the request was sent
+            latency: Seconds the request took
+            status_code: Status of the response, None if the request timed out
+            in_flight: Requests in flight, including this one
+
+        Returns:
+            bool: True if the limit changed by at least a whole slot
+        """
+        with self._lock:
+            old = int(self.limit)
+            if self._congested(endpoint, latency, status_code):
+                # Cut once per round trip, requests sent before the last cut saw the old limit
+                if start > self._last_decrease:
+                    self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                    self._last_decrease = time.perf_counter()
+                    self.decreases += 1
+            elif in_flight >= old:
+                # Only grow while the limit is what holds requests back
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+                self.increases += int(self.limit) > old
+            return int(self.limit) != old
+
+class Limiter:
+    """Blocking limit on the requests in flight across threads, adaptive when given a policy
+
+    Args:
+        limit: Fixed limit, or the starting limit of an adaptive policy
+        adaptive: Policy that adjusts the limit (optional)
+    """
+    def __init__(self, limit: int, adaptive: AdaptiveConcurrency = None) -> None:
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self._limit = limit
+        self._condition = threading.Condition()
+        if adaptive is not None:
+            adaptive.start(limit)
+
+    @property
+    def limit(self) -> int:
+        return self._limit if self.adaptive is None else self.adaptive.current
+
+    @property
+    def capacity(self) -> int:
+        """Highest limit the limiter can reach"""
+        return self._limit if self.adaptive is None else self.adaptive.max_limit
+
+    def acquire(self, blocking: bool = True, timeout: float | None = None) -> bool:
+        """Take a slot, returns False if none was free within the timeout (or at once when not blocking)"""
+        with self._condition:
+            if blocking:
+                if not self._condition.wait_for(lambda: self.in_flight < self.limit, timeout):
+                    return False
+            elif self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            # The limit may have grown while the request was in flight
+            self._condition.notify(max(1, self.limit - self.in_flight))
+
+class AsyncLimiter:
+    """Limit on the requests in flight in an event loop, adaptive when given a policy
+
+    Args:
+        limit: Fixed limit, or the starting limit of an adaptive policy
+        adaptive: Policy that adjusts the limit (optional)
+    """
+    def __init__(self, limit: int, adaptive: AdaptiveConcurrency = None) -> None:
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self._limit = limit
+        self._waiters: deque[asyncio.Future] = deque()
+        if adaptive is not None:
+            adaptive.start(limit)
+
+    @property
+    def limit(self) -> int:
+        return self._limit if self.adaptive is None else self.adaptive.current
+
+    @property
+    def capacity(self) -> int:
+        """Highest limit the limiter can reach"""
+        return self._limit if self.adaptive is None else self.adaptive.max_limit
+
+    def locked(self) -> bool:
+        """True if a request would have to wait for a slot"""
+        return self.in_flight >= self.limit or bool(self._waiters)
+
+    async def acquire(self) -> bool:
+        if not self.locked():
+            self.in_flight += 1
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as the wait was cancelled
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        # Hand free slots to waiters, more than one if the limit grew
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
@@ -0,0 +1,135 @@
+"""Module for operation deadlines and hedged requests
+
+A deadline bounds a whole operation (e.g. every page request of a `get_records` call), each request
+made under it gets the remaining budget as its timeout. Hedging re-sends slow idempotent requests
+once they take longer than the observed latency quantile of their endpoint, and takes whichever
+response arrives first.
+"""
+from __future__ import annotations
+
+from typing import (
+    Iterator,
+)
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import threading
+import time
+
+from httpx import Timeout
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the deadline of an operation passes before it finishes"""
+
+_deadline: ContextVar[float | None] = ContextVar('kinpy_deadline', default=None)
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """Bound every request made within the block (including from `handler.map` threads) to a total time budget
+
+    Nested deadlines can only shorten the budget of the enclosing one.
+
+    Raises:
+        DeadlineExceeded: From the first request made after the deadline has passed,
+            or a request that times out because of it
+
+    Example:
+        >>> with deadline(30):
+        ...     records = app.get_records(['Text'])  # All pages within 30s
+    """
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires = min(expires, current)
+
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> float | None:
+    """Seconds left until the current deadline, None if there is no deadline"""
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+def deadline_timeout(timeout: Timeout) -> Timeout | None:
+    """Shorten each phase of a timeout to the time left until the current deadline
+
+    Returns:
+        Timeout | None: The shortened timeout, None if there is no deadline
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    left = remaining()
+    if left is None:
+        return None
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before the request was sent")
+
+    def cap(value: float | None) -> float:
+        return left if value is None else min(value, left)
+
+    return Timeout(connect=cap(timeout.connect), read=cap(timeout.read), write=cap(timeout.write), pool=cap(timeout.pool))
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+@dataclass
+class HedgePolicy:
+    """When to hedge idempotent requests (GETs, and POSTs overridden to GET)
+
+    A request is hedged once it has taken longer than the `quantile` latency of its endpoint,
+    observed over the last `window` requests. Hedges are capped at `budget` times the number
+    of requests, and only sent when a concurrency slot is free, so they add bounded load.
+
+    Args:
+        quantile: Latency quantile after which a request is hedged (default: 0.95)
+        budget: Maximum ratio of hedged requests to requests (default: 0.05)
+        window: Latencies kept per endpoint (default: 200)
+        min_samples: Latencies needed before an endpoint is hedged (default: 20)
+        min_delay: Shortest wait before hedging in seconds (default: 0.005)
+
+    Example:
+        >>> kintone = KintonePortal('https://example.kintone.com', auth, hedging=HedgePolicy())
+    """
+    quantile: float = 0.95
+    budget: float = 0.05
+    window: int = 200
+    min_samples: int = 20
+    min_delay: float = 0.005
+    requests: int = field(default=0, init=False)
+    hedges: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        self._latencies: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def delay(self, endpoint: str) -> float | None:
+        """Seconds to wait before hedging a request to the endpoint, None if it has too few samples"""
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        return max(self.min_delay, ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))])
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        """Record the latency of a request to the endpoint"""
+        with self._lock:
+            self.requests += 1
+            self._latencies.setdefault(endpoint, deque(maxlen=self.window)).append(latency)
+
+    def acquire(self) -> bool:
+        """Take a hedge from the budget, False if the budget is spent"""
+        with self._lock:
+            if self.hedges + 1 > self.budget * max(self.requests, 1):
+                return False
+            self.hedges += 1
+            return True
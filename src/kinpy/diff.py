@@ -0,0 +1,62 @@
+"""Module for diffing records
+
+Records are handled in the simplified {'field_code': value} form returned by KTApp.
+Kept apart from the models so record updates do not import the model dataclasses.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+)
+
+def _is_subtable(value: Any) -> bool:
+    """Check if a simplified field value has the shape of a SUBTABLE field"""
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(row, dict) and isinstance(row.get('value'), dict) for row in value)
+    )
+
+def diff_subtable(old_rows: list[dict], new_rows: list[dict]) -> list[dict]:
+    """Build the minimal SUBTABLE value that turns `old_rows` into `new_rows`
+
+    Unchanged rows are sent as their row id only, changed rows only include the changed cells
+    and rows without an id are sent in full. Rows missing from `new_rows` are deleted by the API.
+    """
+    old_by_id = {str(row['id']): row for row in old_rows if 'id' in row}
+
+    rows = []
+    for row in new_rows:
+        old_row = old_by_id.get(str(row.get('id')))
+        if old_row is None:
+            rows.append(row)
+            continue
+
+        old_cells: dict = old_row['value']
+        cells = {
+            code: {'value': cell['value']}
+            for code, cell in row['value'].items()
+            if code not in old_cells or old_cells[code].get('value') != cell.get('value')
+        }
+        rows.append({'id': row['id'], 'value': cells} if cells else {'id': row['id']})
+    return rows
+
+def diff_record(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """Return the fields of `new` that differ from `old` (SUBTABLE fields are diffed per row)
+
+    Example:
+        >>> diff_record({'$id': '1', 'Status': 'Open', 'Body': '...'}, {'$id': '1', 'Status': 'Done', 'Body': '...'})
+        {'Status': 'Done'}
+    """
+    changes = {}
+    for code, value in new.items():
+        if code in ('$id', '$revision'):
+            continue
+        if code in old and old[code] == value:
+            continue
+
+        if _is_subtable(value) and _is_subtable(old.get(code)):
+            changes[code] = diff_subtable(old[code], value)
+        else:
+            changes[code] = value
+    return changes
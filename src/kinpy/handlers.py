@@ -1,7 +1,33 @@
 """Module for creating HTTP handlers to be used with the rest of the package"""
 from __future__ import annotations
 
-from httpx import Client, AsyncClient, Response, Auth, URL, Headers
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    TypeVar,
+    TYPE_CHECKING,
+)
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager, asynccontextmanager
+
+import asyncio
+import contextvars
+import time
+
+from httpx import Client, AsyncClient, Response, Auth, URL, Headers, TimeoutException
+
+from .metrics import Metrics
+from .tracing import Tracer, traced
+from .deadlines import DeadlineExceeded, HedgePolicy, deadline_timeout, remaining, expired
+from .concurrency import AdaptiveConcurrency, Limiter, AsyncLimiter
+
+if TYPE_CHECKING:
+    from .recording import TrafficRecorder
+
+T = TypeVar('T')
 
 class KintoneAuth(Auth):
     def __init__(self, token: str):
@@ -25,11 +51,80 @@ class KintoneAuth(Auth):
         self._auth_headers = Headers({
             "X-Cybozu-API-Token" : str(token)
         })
-        
+
+class KintoneAPIError(Exception):
+    """Raised when the Kintone REST API responds with an error status
+
+    Attributes:
+        status_code: HTTP status code of the response
+        code: Kintone error code (e.g. 'CB_VA01')
+        message: Kintone error message
+        errors: Per-field error details keyed by path (e.g. 'records[0].Text.value')
+    """
+    def __init__(self, response: Response):
+        try:
+            body: dict = response.json()
+        except ValueError:
+            body = {}
+
+        self.response = response
+        self.status_code = response.status_code
+        self.code = body.get('code')
+        self.message = body.get('message', response.reason_phrase)
+        self.errors = body.get('errors', {})
+        super().__init__(f'[{self.status_code}] {self.code}: {self.message}')
+
+def _observe(metrics: Metrics, method: str, url: URL, start: float, response: Response | None, streamed: bool = False) -> None:
+    """Record a finished request, `response` is None if the request failed without one"""
+    latency = time.perf_counter() - start
+    if response is None:
+        metrics.observe(method, URL(url).path, latency)
+        return
+
+    metrics.observe(
+        method,
+        URL(url).path,
+        latency,
+        response.status_code,
+        bytes_sent=int(response.request.headers.get('content-length', 0)),
+        bytes_received=response.num_bytes_downloaded if streamed else len(response.content),
+    )
+
+def _is_idempotent(method: str, data: dict) -> bool:
+    """GET requests, including POSTs with the method overridden to GET, can safely be sent twice"""
+    return method == 'GET' or (data.get('headers') or {}).get('X-HTTP-Method-Override') == 'GET'
+
+def _wait_time(delay: float | None = None) -> float | None:
+    """Time to wait, shortened to the time left until the current deadline"""
+    left = remaining()
+    if left is None:
+        return delay
+    left = max(left, 0.0)
+    return left if delay is None else min(delay, left)
+
 class HTTPX_Sync:
-    """HTTPX Sync handler"""
+    """HTTPX Sync handler
+
+    Args:
+        client: The HTTPX client used to make requests
+        auth: Kintone authentication
+        max_concurrency: Maximum number of requests in flight at once across threads,
+            the starting limit when `adaptive` is given (default: 4)
+        metrics: Collects per-endpoint request metrics when specified (optional)
+        tracer: Emits a span per request, split into connect/send/wait/receive phases (optional)
+        hedging: Re-sends slow idempotent requests and takes the first response (optional)
+        recorder: Writes every request and response to a traffic recording (optional)
+        adaptive: Adjusts the concurrency limit to throttling and latency, exposed as the
+            `concurrency_limit` gauge of `metrics` (optional)
+        opts: Attributes to set on the client (e.g. timeout)
+
+    Note:
+        Requests made within a `deadline()` block get the time left as their timeout
+    """
     
-    def __init__(self, client: Client, auth: KintoneAuth, **opts) -> None:
+    def __init__(self, client: Client, auth: KintoneAuth, max_concurrency: int = 4, metrics: Metrics = None,
+                 tracer: Tracer = None, hedging: HedgePolicy = None, recorder: TrafficRecorder = None,
+                 adaptive: AdaptiveConcurrency = None, **opts) -> None:
         client.auth = auth # Auth is required
         
         # Passthrough options to the handler
@@ -38,29 +133,206 @@ class HTTPX_Sync:
                setattr(client, attr, val)
 
         self.client = client
+        self.max_concurrency = max_concurrency
+        self.metrics = metrics
+        self.tracer = tracer
+        self.hedging = hedging
+        self.recorder = recorder
+        self.adaptive = adaptive
+        self._limiter = Limiter(max_concurrency, adaptive)
+        self._set_limit_gauge()
+        self._hedge_executor: ThreadPoolExecutor | None = None
                
     def get(self, url: URL, **data) -> Response:
-        return self.client.get(url, **data)
+        return self._send('GET', url, **data)
 
     def post(self, url: URL, **data) -> Response:
-        return self.client.post(url, **data)
+        return self._send('POST', url, **data)
 
     def put(self, url: URL, **data) -> Response:
-        return self.client.put(url, **data)
+        return self._send('PUT', url, **data)
 
     def delete(self, url: URL, **data) -> Response:
-        return self.client.delete(url, **data)
+        return self._send('DELETE', url, **data)
 
     def patch(self, url: URL, **data) -> Response:
-        return self.client.patch(url, **data)
+        return self._send('PATCH', url, **data)
+
+    def map(self, func: Callable[..., T], *iterables: Iterable, max_workers: int = None) -> list[T]:
+        """Call `func` over the iterables concurrently, requests made by `func` share the handler's concurrency limit
+
+        Args:
+            func: Function to call with an item from each iterable
+            iterables: Arguments to call `func` with
+            max_workers: Number of threads to run `func` in (default: the highest concurrency limit)
+
+        Example:
+            >>> handler.map(lambda route: route(), routes)
+            [<Response [200 OK]>, ...]
+        """
+        # Run each call in a copy of the caller's context so tracing spans nest under the caller
+        context = contextvars.copy_context()
+        def run(*args):
+            return context.copy().run(func, *args)
+
+        with ThreadPoolExecutor(max_workers=max_workers or self._limiter.capacity) as executor:
+            return list(executor.map(run, *iterables))
+
+    @contextmanager
+    def stream(self, method: str, url: URL, **data) -> Iterator[Response]:
+        """Make a request without reading the response body (the concurrency slot is held until the stream closes)"""
+        self._apply_deadline(data)
+        with self._slot():
+            start = time.perf_counter()
+            response = None
+            try:
+                with self.client.stream(method, url, **data) as response:
+                    yield response
+            finally:
+                if self.metrics is not None:
+                    _observe(self.metrics, method, url, start, response, streamed=True)
+                if self.recorder is not None and response is not None:
+                    self.recorder.record(response, start, time.perf_counter() - start, streamed=True)
+
+    def _apply_deadline(self, data: dict) -> None:
+        timeout = deadline_timeout(self.client.timeout)
+        if timeout is not None:
+            data['timeout'] = timeout
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        """Hold a concurrency slot, waiting no longer than the current deadline"""
+        wait_time = _wait_time()
+        if not self._limiter.acquire(timeout=wait_time):
+            raise DeadlineExceeded("Deadline exceeded waiting for a concurrency slot")
+        try:
+            yield
+        finally:
+            self._limiter.release()
+
+    def _send(self, method: str, url: URL, **data) -> Response:
+        self._apply_deadline(data)
+        if self.hedging is not None and _is_idempotent(method, data):
+            return self._send_hedged(method, url, **data)
+        with self._slot():
+            return self._request(method, url, **data)
+
+    def _request(self, method: str, url: URL, **data) -> Response:
+        start = time.perf_counter()
+        try:
+            if self.metrics is None and self.tracer is None and self.recorder is None:
+                response = self.client.request(method, url, **data)
+            else:
+                response = self._send_instrumented(method, url, **data)
+        except TimeoutException as e:
+            self._adapt(url, start, None)
+            if expired():
+                raise DeadlineExceeded(f"Deadline exceeded during {method} {URL(url).path}") from e
+            raise
+        self._adapt(url, start, response)
+        return response
+
+    def _adapt(self, url: URL, start: float, response: Response | None) -> None:
+        """Feed a finished request (None if it timed out) to the adaptive limit"""
+        if self.adaptive is None:
+            return
+        status_code = None if response is None else response.status_code
+        if self.adaptive.observe(URL(url).path, start, time.perf_counter() - start, status_code, self._limiter.in_flight):
+            self._set_limit_gauge()
+
+    def _set_limit_gauge(self) -> None:
+        if self.metrics is not None:
+            self.metrics.set_gauge('concurrency_limit', self._limiter.limit)
+
+    def _send_hedged(self, method: str, url: URL, **data) -> Response:
+        """Send a request, and a duplicate if it is slower than the endpoint's observed latency quantile"""
+        endpoint = URL(url).path
+        start = time.perf_counter()
+        delay = self.hedging.delay(endpoint)
+        if delay is None:
+            # Not enough samples for the endpoint yet
+            with self._slot():
+                response = self._request(method, url, **data)
+            self.hedging.observe(endpoint, time.perf_counter() - start)
+            return response
+
+        def attempt(hedge: bool) -> Response | None:
+            if not hedge:
+                with self._slot():
+                    return self._request(method, url, **data)
+            # Hedges only use a free slot, they never queue behind other requests
+            if not self._limiter.acquire(blocking=False):
+                return None
+            try:
+                return self._request(method, url, **data)
+            finally:
+                self._limiter.release()
+
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=self._limiter.capacity * 2, thread_name_prefix='kinpy-hedge')
+        context = contextvars.copy_context()
+        pending = {self._hedge_executor.submit(context.copy().run, attempt, False)}
+
+        done, _ = wait(pending, timeout=_wait_time(delay))
+        if not done and not expired() and self.hedging.acquire():
+            pending.add(self._hedge_executor.submit(context.copy().run, attempt, True))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=_wait_time(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"Deadline exceeded during {method} {endpoint}")
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                elif future.result() is not None:
+                    # The slower request is left to finish in the background
+                    self.hedging.observe(endpoint, time.perf_counter() - start)
+                    return future.result()
+        raise error
+
+    def _send_instrumented(self, method: str, url: URL, **data) -> Response:
+        with traced(self.tracer, 'request', method=method, endpoint=URL(url).path):
+            if self.tracer is not None and self.tracer.enabled:
+                data['extensions'] = {**data.get('extensions', {}), 'trace': self.tracer.request_hook()}
+
+            start = time.perf_counter()
+            response = None
+            try:
+                response = self.client.request(method, url, **data)
+                return response
+            finally:
+                if self.metrics is not None:
+                    _observe(self.metrics, method, url, start, response)
+                if self.recorder is not None and response is not None:
+                    self.recorder.record(response, start, time.perf_counter() - start)
     
     def __repr__(self):
         return f'<HTTPX_Sync {self.client.base_url}>'
     
 class HTTPX_Async:
-    """HTTPX Async handler"""
+    """HTTPX Async handler
+
+    Args:
+        client: The HTTPX client used to make requests
+        auth: Kintone authentication
+        max_concurrency: Maximum number of requests in flight at once across tasks,
+            the starting limit when `adaptive` is given (default: 4)
+        metrics: Collects per-endpoint request metrics when specified (optional)
+        tracer: Emits a span per request, split into connect/send/wait/receive phases (optional)
+        hedging: Re-sends slow idempotent requests and takes the first response (optional)
+        recorder: Writes every request and response to a traffic recording (optional)
+        adaptive: Adjusts the concurrency limit to throttling and latency, exposed as the
+            `concurrency_limit` gauge of `metrics` (optional)
+        opts: Attributes to set on the client (e.g. timeout)
+
+    Note:
+        Requests made within a `deadline()` block get the time left as their timeout
+    """
 
-    def __init__(self, client: AsyncClient, auth: KintoneAuth, **opts) -> None:
+    def __init__(self, client: AsyncClient, auth: KintoneAuth, max_concurrency: int = 4, metrics: Metrics = None,
+                 tracer: Tracer = None, hedging: HedgePolicy = None, recorder: TrafficRecorder = None,
+                 adaptive: AdaptiveConcurrency = None, **opts) -> None:
         client.auth = auth # Auth is required
         
         # Passthrough options to the handler
@@ -69,21 +341,166 @@ class HTTPX_Async:
                setattr(client, attr, val) 
         
         self.client = client
+        self.max_concurrency = max_concurrency
+        self.metrics = metrics
+        self.tracer = tracer
+        self.hedging = hedging
+        self.recorder = recorder
+        self.adaptive = adaptive
+        self._limiter = AsyncLimiter(max_concurrency, adaptive)
+        self._set_limit_gauge()
 
     async def get(self, url: URL, **data) -> Response:
-        return await self.client.get(url, **data)
+        return await self._send('GET', url, **data)
 
     async def post(self, url: URL, **data) -> Response:
-        return await self.client.post(url, **data)
+        return await self._send('POST', url, **data)
 
     async def put(self, url: URL, **data) -> Response:
-        return await self.client.put(url, **data)
+        return await self._send('PUT', url, **data)
 
     async def delete(self, url: URL, **data) -> Response:
-        return await self.client.delete(url, **data)
+        return await self._send('DELETE', url, **data)
 
     async def patch(self, url: URL, **data) -> Response:
-        return await self.client.patch(url, **data)
+        return await self._send('PATCH', url, **data)
+
+    async def map(self, func: Callable[..., Awaitable[T]], *iterables: Iterable) -> list[T]:
+        """Await `func` over the iterables concurrently, requests made by `func` share the handler's concurrency limit
+
+        Example:
+            >>> await handler.map(lambda route: route(), routes)
+            [<Response [200 OK]>, ...]
+        """
+        return list(await asyncio.gather(*(func(*args) for args in zip(*iterables))))
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: URL, **data) -> AsyncIterator[Response]:
+        """Make a request without reading the response body (the concurrency slot is held until the stream closes)"""
+        self._apply_deadline(data)
+        async with self._slot():
+            start = time.perf_counter()
+            response = None
+            try:
+                async with self.client.stream(method, url, **data) as response:
+                    yield response
+            finally:
+                if self.metrics is not None:
+                    _observe(self.metrics, method, url, start, response, streamed=True)
+                if self.recorder is not None and response is not None:
+                    self.recorder.record(response, start, time.perf_counter() - start, streamed=True)
+
+    def _apply_deadline(self, data: dict) -> None:
+        timeout = deadline_timeout(self.client.timeout)
+        if timeout is not None:
+            data['timeout'] = timeout
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """Hold a concurrency slot, waiting no longer than the current deadline"""
+        try:
+            await asyncio.wait_for(self._limiter.acquire(), _wait_time())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Deadline exceeded waiting for a concurrency slot") from None
+        try:
+            yield
+        finally:
+            self._limiter.release()
+
+    async def _send(self, method: str, url: URL, **data) -> Response:
+        self._apply_deadline(data)
+        if self.hedging is not None and _is_idempotent(method, data):
+            return await self._send_hedged(method, url, **data)
+        async with self._slot():
+            return await self._request(method, url, **data)
+
+    async def _request(self, method: str, url: URL, **data) -> Response:
+        start = time.perf_counter()
+        try:
+            if self.metrics is None and self.tracer is None and self.recorder is None:
+                response = await self.client.request(method, url, **data)
+            else:
+                response = await self._send_instrumented(method, url, **data)
+        except TimeoutException as e:
+            self._adapt(url, start, None)
+            if expired():
+                raise DeadlineExceeded(f"Deadline exceeded during {method} {URL(url).path}") from e
+            raise
+        self._adapt(url, start, response)
+        return response
+
+    def _adapt(self, url: URL, start: float, response: Response | None) -> None:
+        """Feed a finished request (None if it timed out) to the adaptive limit"""
+        if self.adaptive is None:
+            return
+        status_code = None if response is None else response.status_code
+        if self.adaptive.observe(URL(url).path, start, time.perf_counter() - start, status_code, self._limiter.in_flight):
+            self._set_limit_gauge()
+
+    def _set_limit_gauge(self) -> None:
+        if self.metrics is not None:
+            self.metrics.set_gauge('concurrency_limit', self._limiter.limit)
+
+    async def _send_hedged(self, method: str, url: URL, **data) -> Response:
+        """Send a request, and a duplicate if it is slower than the endpoint's observed latency quantile"""
+        endpoint = URL(url).path
+        start = time.perf_counter()
+        delay = self.hedging.delay(endpoint)
+        if delay is None:
+            # Not enough samples for the endpoint yet
+            async with self._slot():
+                response = await self._request(method, url, **data)
+            self.hedging.observe(endpoint, time.perf_counter() - start)
+            return response
+
+        async def attempt(hedge: bool) -> Response | None:
+            if not hedge:
+                async with self._slot():
+                    return await self._request(method, url, **data)
+            # Hedges only use a free slot, they never queue behind other requests
+            if self._limiter.locked():
+                return None
+            async with self._limiter:
+                return await self._request(method, url, **data)
+
+        pending = {asyncio.ensure_future(attempt(False))}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=_wait_time(delay))
+            if not done and not expired() and self.hedging.acquire():
+                pending.add(asyncio.ensure_future(attempt(True)))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=_wait_time(), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise DeadlineExceeded(f"Deadline exceeded during {method} {endpoint}")
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif task.result() is not None:
+                        self.hedging.observe(endpoint, time.perf_counter() - start)
+                        return task.result()
+            raise error
+        finally:
+            # Cancel the slower request
+            for task in pending:
+                task.cancel()
+
+    async def _send_instrumented(self, method: str, url: URL, **data) -> Response:
+        with traced(self.tracer, 'request', method=method, endpoint=URL(url).path):
+            if self.tracer is not None and self.tracer.enabled:
+                data['extensions'] = {**data.get('extensions', {}), 'trace': self.tracer.async_request_hook()}
+
+            start = time.perf_counter()
+            response = None
+            try:
+                response = await self.client.request(method, url, **data)
+                return response
+            finally:
+                if self.metrics is not None:
+                    _observe(self.metrics, method, url, start, response)
+                if self.recorder is not None and response is not None:
+                    self.recorder.record(response, start, time.perf_counter() - start)
 
     def __repr__(self):
-            return f'<HTTPX_Async {self.client.base_url}>'
\ No newline at end of file
+            return f'<HTTPX_Async {self.client.base_url}>'
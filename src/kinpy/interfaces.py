@@ -10,18 +10,38 @@ from typing import (
     Any,
     TypeVar, 
     Optional,
+    TYPE_CHECKING,
     Callable,
+    BinaryIO,
+    Iterator,
+    Iterable,
+    Literal,
 )
 
 import functools
+import itertools
+import os
 
 import json
 
-from httpx import Client as HTTPX_Client
+from httpx import Client as HTTPX_Client, AsyncClient as HTTPX_AsyncClient, Response, BaseTransport, AsyncBaseTransport
 
 from .routes import Routes
-from .handlers import HTTPX_Async, HTTPX_Sync, KintoneAuth
+from .handlers import HTTPX_Async, HTTPX_Sync, KintoneAuth, KintoneAPIError
 from .utils import QueryString
+from .buffers import WriteBuffer
+from .joins import Join, Relation
+from .aggregation import Aggregation
+from .subtables import iter_flat_pages
+from .lazy import LazyRecordSet
+from .catalog import AppCatalog
+from .diff import diff_record
+from .tracing import traced
+from .query import compile_query, Node, Condition, Query, And, Or
+
+if TYPE_CHECKING:
+    from .snapshot import SnapshotReport
+    from .spool import Spool
 
 # TODO: Return type of a container property (e.g. .get_apps()) should be a bespoke container class
 # That implements nice indexing and "select_by" methods. For reference see C# LINQ
@@ -61,32 +81,132 @@ class KTQueryable(list):
         """Return a new KTQueryable with only items that match the function"""
         return KTQueryable(item for item in self if func(item))
 
+    def where(self, query: str | QueryString) -> KTQueryable:
+        """Return a new KTQueryable with the items matching a Kintone query string, evaluated locally
+
+        Example:
+            >>> records.where('Status = "Open" and Amount > 100 order by Amount desc limit 10')
+        """
+        return KTQueryable(compile_query(query).apply(self))
+
     def __getitem__(self, key):
         if isinstance(key, slice):
             return KTQueryable(super().__getitem__(key))
         return super().__getitem__(key)
 
+def _chunks(items: list, size: int) -> list[list]:
+    """Split a list into lists of at most `size` items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _copy_stream(response: Response, dest: BinaryIO, chunk_size: int) -> int:
+    """Write a streamed response body to a file object in chunks"""
+    written = 0
+    for chunk in response.iter_bytes(chunk_size):
+        dest.write(chunk)
+        written += len(chunk)
+    return written
+
+def _as_query_string(query: str) -> QueryString:
+    return query if isinstance(query, QueryString) else QueryString(query)
+
+def _split_in_lists(query: QueryString, max_values: int) -> list[QueryString]:
+    """Split a query with oversized `in (...)` lists into queries whose results union to the original"""
+    if query.node is None and ' in ' not in query.query.lower():
+        return [query]
+    try:
+        ast = query.ast
+    except ValueError:
+        return [query]
+    if ast.condition is None:
+        return [query]
+    if ast.limit is not None or ast.offset is not None:
+        # A limit or offset applies to the whole result, not to each part of the union
+        return [query]
+
+    conditions = [ast.condition]
+    while True:
+        split = []
+        for condition in conditions:
+            oversized = _find_oversized_in(condition, max_values)
+            if oversized is None:
+                split.append(condition)
+                continue
+            values = oversized.value
+            split.extend(
+                _replace_node(condition, oversized, Condition(oversized.field, 'in', values[i:i + max_values]))
+                for i in range(0, len(values), max_values)
+            )
+        if len(split) == len(conditions):
+            break
+        conditions = split
+
+    if len(conditions) == 1:
+        return [query]
+    return [QueryString(str(Query(condition, ast.order_by, ast.limit, ast.offset))) for condition in conditions]
+
+def _find_oversized_in(node: Node, max_values: int) -> Condition | None:
+    if isinstance(node, (And, Or)):
+        for term in node.terms:
+            if (found := _find_oversized_in(term, max_values)) is not None:
+                return found
+        return None
+    # Only `in` distributes over a union of its values, `not in` can't be split
+    if node.op == 'in' and len(node.value) > max_values:
+        return node
+    return None
+
+def _replace_node(node: Node, old: Node, new: Node) -> Node:
+    if node is old:
+        return new
+    if isinstance(node, (And, Or)):
+        return type(node)(tuple(_replace_node(term, old, new) for term in node.terms))
+    return node
+
+def _stringify_values(record: dict[str, Any]) -> dict[str, Any]:
+    """Convert numbers to strings so they compare equal to the values returned by the API"""
+    return {
+        k: str(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else v
+        for k, v in record.items()
+    }
+
 class KintonePortal:
-    def __init__(self, base_url: str, auth: KintoneAuth, sync: bool = True) -> None:
+    def __init__(self, base_url: str, auth: KintoneAuth, sync: bool = True, transport: BaseTransport | AsyncBaseTransport = None, **opts) -> None:
         # NOTE: Should auth be handled on a per-app basis?
         # API Keys only allow permissions within apps, to do anything to the greater Kintone portal, you need user/pass auth
-        client = HTTPX_Client(base_url=base_url)
+        # Handler options (e.g. max_concurrency) are passed through, a custom transport (e.g. httpx.MockTransport) can replace the network
         if sync:
-            self.handler = HTTPX_Sync(client, auth)
+            self.handler = HTTPX_Sync(HTTPX_Client(base_url=base_url, transport=transport), auth, **opts)
         else:
-            self.handler = HTTPX_Async(client, auth)
+            self.handler = HTTPX_Async(HTTPX_AsyncClient(base_url=base_url, transport=transport), auth, **opts)
         
         self.routes = Routes(self.handler)
+        self._apps: AppCatalog | None = None
 
     # TODO: Implement user/pass auth for portal-level functions
     @property
-    def apps(self) -> list:
-        """Return a list of Apps"""
-        route = self.routes.get_apps()
+    def apps(self) -> AppCatalog:
+        """Cached catalog of the Apps of the portal, indexed by ID, code, name and space"""
+        if self._apps is None:
+            self._apps = AppCatalog(self)
+        return self._apps
 
-        return route()
+    def snapshot(self, dest_dir: str | os.PathLike, apps: Iterable[int | str | KTApp] = None, **opts) -> SnapshotReport:
+        """Write the records of several Apps (default: every App) to `<app id>.jsonl` files in parallel
+
+        Options (e.g. workers, max_per_app) are passed to `Snapshot`, see it for the scheduling.
+
+        Returns:
+            SnapshotReport: Records, bytes written and elapsed time per App
+        """
+        from .snapshot import Snapshot
+        return Snapshot(self, dest_dir, **opts).run(apps)
 
 class KTApp:
+    # Longest URL encoded query sent in a GET request, longer queries are sent in a POST body
+    max_get_query_length = 4096
+    # Largest `in (...)` list sent in a single query by `get_records`, longer lists are split
+    max_in_values = 500
+
     def __init__(self, kintone_portal: KintonePortal, app_id: int) -> None:
         
         self._portal = kintone_portal
@@ -116,62 +236,278 @@ class KTApp:
     # TODO: Implement record and field data models here
     # Is there any way to make the class definition dynamic such that I can arbitrarily pass kwargs with field names?
     def get_records(self, fields: list[str], query: QueryString = QueryString(''), _last_record_id: int = None) -> list[dict[str, Any]]:
-        """Runs a bulk set of requests to retrieve records (one API call per 500 records)"""
-        
+        """Runs a bulk set of requests to retrieve records (one API call per 500 records)
+
+        Note:
+            Queries with an `in (...)` list longer than `max_in_values` are split into several
+            queries that run concurrently, their results are merged and deduplicated by `$id`.
+            Queries with a `limit` or `offset` are never split
+        """
+        with traced(self._portal.handler.tracer, 'get_records', app=self.app_id):
+            queries = _split_in_lists(_as_query_string(query), self.max_in_values)
+            try:
+                if len(queries) == 1:
+                    records: list[dict[str, Any]] = []
+                    for page in self.iter_record_pages(fields, queries[0], _last_record_id):
+                        records.extend(page)
+                    return records
+
+                results = self._portal.handler.map(
+                    lambda query: [record for page in self.iter_record_pages(fields, query, _last_record_id) for record in page],
+                    queries,
+                )
+            except KintoneAPIError:
+                return None
+
+            merged = {record['$id']: record for result in results for record in result}
+            return sorted(merged.values(), key=lambda record: int(record['$id']))
+
+    def get_lazy_records(self, fields: list[str] = (), query: QueryString = QueryString('')) -> LazyRecordSet:
+        """Get the records matching the query with only `$id` and the given fields loaded
+
+        Other fields are loaded on first access, for all records of the result set at once.
+
+        Example:
+            >>> records = app.get_lazy_records(query=QueryString('Status') == 'Open')
+            >>> total = sum(float(record['Amount']) for record in records)  # Fetches Amount only
+        """
+        records = self.get_records(list(fields), query)
+        if records is None:
+            return None
+        return LazyRecordSet(self, records, fields)
+
+    def spool_records(self, path: str | os.PathLike, fields: list[str], query: QueryString = QueryString('')) -> Spool:
+        """Write the records matching the query to a spool file page by page, and open it
+
+        Memory use is bounded by a single page while fetching, the returned `Spool` decodes
+        records on access, so large results can be read several times without holding them as dicts.
+
+        Raises:
+            KintoneAPIError: If a page request fails (the spool file is incomplete)
+
+        Example:
+            >>> with app.spool_records('orders.spool', ['Amount', 'Status']) as records:
+            ...     open_orders = sum(1 for record in records if record['Status'] == 'Open')
+            ...     revenue = sum(float(record['Amount']) for record in records)
+        """
+        from .spool import Spool, SpoolWriter
+        with SpoolWriter(path) as spool:
+            for page in self.iter_record_pages(fields, query):
+                spool.write(page)
+        return Spool(path)
+
+    def _get_records_route(self, query: QueryString):
+        """GET records route for the query, the method override route if the URL encoded query is too long"""
+        if len(query.encode()) <= self.max_get_query_length:
+            return self._portal.routes.get_records
+        return self._portal.routes.get_records_override
+
+    def iter_record_pages(self, fields: list[str], query: QueryString = QueryString(''), _last_record_id: int = None) -> Iterator[list[dict[str, Any]]]:
+        """Yield the records matching the query one page (up to 500 records) at a time
+
+        Note:
+            Queries longer than `max_get_query_length` once URL encoded are sent
+            in a POST body with `X-HTTP-Method-Override: GET`
+
+        Raises:
+            KintoneAPIError: If a page request fails
+        """
+        query = _as_query_string(query)
+        tracer = self._portal.handler.tracer
         chunk_size = 500
         order_and_limit = QueryString(f'order by $id asc limit {chunk_size}')
+        last_record_id = _last_record_id
+
+        while True:
+            with traced(tracer, 'page', cursor=last_record_id):
+                # Cursor query appended each iteration
+                bulk_query = QueryString(f'$id > {last_record_id}') if last_record_id else QueryString('')
+
+                page_query = (query & bulk_query) + order_and_limit
+                route = self._get_records_route(page_query)(
+                    app = self.app_id,
+                    fields = ','.join(fields + ['$id']),
+                    query = str(page_query),
+                    totalCount = True
+                )
+                response = route()
+
+                with traced(tracer, 'decode', bytes=len(response.content)):
+                    body: dict = json.loads(response.content)
+
+                if 'records' not in body:
+                    raise KintoneAPIError(response)
+
+                # Simplify record structure into simple dict
+                # ['field_name': value, ...]
+                with traced(tracer, 'transform', records=len(body['records'])):
+                    records: list[ dict[str, Any] ] = \
+                    [
+                        {
+                            key: value['value']
+                            for key, value in record.items()
+                        }
+                        for record in body['records']
+                    ]
+
+            yield records
+
+            # Total count of records matching query (only max of 500 returned)
+            if int(body['totalCount']) <= chunk_size or not records:
+                return
+            last_record_id = max(int(record['$id']) for record in records)
+    
+    def iter_subtable_pages(self, fields: list[str], query: QueryString = QueryString(''), columnar: bool = False) -> Iterator[tuple[list[dict[str, Any]], dict[str, Any]]]:
+        """Yield the records matching the query one page at a time, split into parent rows and SUBTABLE rows
 
-        # Recursive query appended each iteration
-        bulk_query = QueryString(f'$id > {_last_record_id}') if _last_record_id else QueryString('')
+        Child rows carry the parent `$id`, the subtable code (`$subtable`) and the row id (`$row_id`)
+        as keys, parent rows hold every other field.
 
-        query: QueryString = query & bulk_query
+        Args:
+            fields: Field codes to fetch, SUBTABLE fields among them are split out
+            query: Query the records must match
+            columnar: Yield child tables as column name to list of values, with the
+                subtable's cells as columns (default: False)
 
-        route = self._portal.routes.get_records(
-            app = self.app_id,
-            fields = ','.join(fields + ['$id']),
-            query = str(query + order_and_limit),
-            totalCount = True
-        )
+        Yields:
+            tuple: The parent rows of the page and the child rows (or child tables) by subtable code
 
-        response: dict = json.loads(route().content)
+        Raises:
+            KintoneAPIError: If a page request fails
+
+        Example:
+            >>> for orders, children in app.iter_subtable_pages(['OrderNo', 'Items']):
+            ...     load('orders', orders)
+            ...     load('order_items', children['Items'])
+        """
+        form = self.get_form_fields()
+        if form is None:
+            raise ValueError(f"Could not get the form fields of app {self.app_id}")
+
+        properties = form['properties']
+        subtables = {
+            code: list(properties[code].get('fields', {}))
+            for code in fields
+            if properties.get(code, {}).get('type') == 'SUBTABLE'
+        }
+        return iter_flat_pages(self.iter_record_pages(fields, query), subtables, columnar)
+
+    def iter_typed_pages(self, fields: list[str], query: QueryString = QueryString(''), columnar: bool = False) -> Iterator[list[dict[str, Any]] | dict[str, Any]]:
+        """Yield the records matching the query one page at a time, with numbers, dates and times converted
+
+        Values are converted column by column using the field types of the App's form, see
+        `RecordCoercer` for the types. Text, choice and user fields are passed through unchanged.
+
+        Args:
+            fields: Field codes to fetch
+            query: Query the records must match
+            columnar: Yield each page as field code to column, typed columns as NumPy arrays
+                when NumPy is installed (default: False)
 
-        if 'records' not in response:
+        Raises:
+            KintoneAPIError: If a page request fails
+
+        Example:
+            >>> for page in app.iter_typed_pages(['Amount', 'Ordered'], columnar=True):
+            ...     total += page['Amount'].sum()
+        """
+        from .coercion import RecordCoercer
+        coercer = RecordCoercer.from_app(self)
+        tracer = self._portal.handler.tracer
+        for page in self.iter_record_pages(fields, query):
+            with traced(tracer, 'coerce', records=len(page)):
+                page = coercer.columns(page) if columnar else coercer.coerce(page)
+            yield page
+
+    def count_records(self, query: QueryString = QueryString('')) -> int:
+        """Count the records matching the query from `totalCount`, without fetching the records
+
+        Note:
+            The API does not accept `limit 0`, a single `$id` is fetched alongside the count
+        """
+        query = _as_query_string(query) + QueryString('limit 1')
+        response = self._get_records_route(query)(app=self.app_id, fields='$id', query=str(query), totalCount=True)()
+        body: dict = json.loads(response.content)
+        if 'totalCount' not in body:
             return None
+        return int(body['totalCount'])
 
-        # Simplify record structure into simple dict
-        # ['field_name': value, ...]
-        records: list[ dict[str, Any] ] = \
-        [
-            {
-                key: value['value']
-                for key, value in record.items()
-            }
-            for record in response['records']
-        ]
-        
-        # Total count of records matching query (only max of 500 returned)
-        total_count = int(response['totalCount'])
-        if total_count > chunk_size:
-            last_record_id = max(int(record['$id']) for record in records)
-            return records + self.get_records(fields, query, last_record_id)
+    def aggregate(self, group_by: str | list[str] = None, metrics: dict[str, str | tuple[str, str]] = None,
+                  query: QueryString = QueryString('')) -> dict[str, Any]:
+        """Count, sum, average and min/max fields over the records matching the query, optionally by group
+
+        Only the grouped and aggregated fields are fetched, each page is folded into running
+        accumulators and discarded, so memory does not grow with the number of records.
+        Counting all matching records without grouping only reads `totalCount`.
+
+        Args:
+            group_by: Field code or codes to group by (optional)
+            metrics: Metric name to `'count'` or a `(function, field)` tuple, where function is
+                one of 'count', 'sum', 'mean', 'min' or 'max' (default: `{'count': 'count'}`)
+            query: Query the aggregated records must match
+
+        Returns:
+            dict: The metrics, or the metrics by group value (a tuple of values when grouping by several fields)
+
+        Example:
+            >>> app.aggregate('Status', {'orders': 'count', 'revenue': ('sum', 'Amount')}, QueryString('Year') == 2024)
+            {'Open': {'orders': 12, 'revenue': 5400.0}, 'Done': {'orders': 310, 'revenue': 182250.0}}
+        """
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by or [])
+        aggregation = Aggregation(group_by, metrics or {'count': 'count'})
+
+        if not group_by and not aggregation.value_fields:
+            count = self.count_records(query)
+            return None if count is None else {name: count for name in aggregation.metrics}
+
+        tracer = self._portal.handler.tracer
+        try:
+            for page in self.iter_record_pages(aggregation.fields, query):
+                with traced(tracer, 'accumulate', records=len(page)):
+                    aggregation.add(page)
+        except KintoneAPIError:
+            return None
+
+        return aggregation.result()
+
+    def update_record(self, record: dict[str, Any], revision: int | str = None, original: dict[str, Any] = None):
+        """Update specified record ($id needs to be specified)
+
+        Args:
+            record: The record fields to update
+            revision: Expected revision of the record, the update fails if it does not match (optional)
+            original: The record as it was fetched, only fields that differ from it are sent (optional)
+        """
+        if original is not None:
+            fields = diff_record(original, record)
         else:
-            return records
-    
-    def update_record(self, record: dict[str, Any]):
-        """Update specified record ($id needs to be specified)"""
+            fields = {k: v for k, v in record.items() if k != '$id'}
 
         # Re-structure record in API-friendly format
         record_update: dict[str, dict[str, Any] ] = \
         {
             k: {'value': v}
-            for k, v in record.items() if k != '$id'
+            for k, v in fields.items()
         }
 
-        route = self._portal.routes.update_record(app=self.app_id, id=record['$id'], record=record_update)
+        params = {'app': self.app_id, 'id': record['$id'], 'record': record_update}
+        if revision is not None:
+            params['revision'] = revision
+
+        route = self._portal.routes.update_record(**params)
         response: dict = json.loads(route().content)
 
         return response
 
+    def write_buffer(self, max_records: int = 100, max_delay: float | None = 1.0) -> WriteBuffer:
+        """Create a write-behind buffer that coalesces `update_record` calls into bulk requests
+
+        Args:
+            max_records: Number of distinct pending records that triggers a flush (default: 100)
+            max_delay: Seconds to wait before flushing pending updates, None disables timed flushes (default: 1.0)
+        """
+        return WriteBuffer(self, max_records=max_records, max_delay=max_delay)
+
     def add_record(self, record: dict[str, Any]):
         """Create new record"""
 
@@ -187,6 +523,383 @@ class KTApp:
 
         return response
     
+    def upsert_records(self, rows: list[dict[str, Any]], key_field: str, chunk_size: int = 100) -> dict[str, Any]:
+        """Insert or update rows by a unique key field, skipping rows that have not changed
+
+        Existing records are looked up in batched `key_field in (...)` queries, new rows are added
+        in bulk and changed rows are updated in bulk by `updateKey`, with all chunks sent concurrently.
+
+        Args:
+            rows: Records to write, each must contain `key_field`
+            key_field: Field code of a field with "Prohibit duplicate values" enabled
+            chunk_size: Records per lookup query and per bulk request (default: 100, the API maximum)
+
+        Returns:
+            dict: Counts of `inserted`, `updated`, `unchanged` and `failed` rows,
+                with the `KintoneAPIError` of each failed chunk under `errors`
+
+        Example:
+            >>> app.upsert_records([{'Code': 'A-1', 'Price': '10'}, {'Code': 'A-2', 'Price': '12'}], 'Code')
+            {'inserted': 1, 'updated': 1, 'unchanged': 0, 'failed': 0, 'errors': []}
+        """
+        handler = self._portal.handler
+
+        # Later rows with the same key overwrite earlier ones
+        rows_by_key: dict[str, dict[str, Any]] = {}
+        for row in rows:
+            rows_by_key.setdefault(str(row[key_field]), {}).update(row)
+
+        keys = list(rows_by_key)
+        fields = sorted({field for row in rows_by_key.values() for field in row} | {key_field})
+
+        def lookup(batch: list[str]) -> list[dict[str, Any]]:
+            records = self.get_records(fields, QueryString(key_field).in_(*batch))
+            if records is None:
+                raise LookupError(f"Failed to look up existing records by {key_field}")
+            return records
+
+        existing: dict[str, dict[str, Any]] = {
+            str(record[key_field]): record
+            for records in handler.map(lookup, _chunks(keys, chunk_size))
+            for record in records
+        }
+
+        inserts: list[dict[str, Any]] = []
+        updates: list[dict[str, Any]] = []
+        for key, row in rows_by_key.items():
+            if key not in existing:
+                inserts.append({k: {'value': v} for k, v in row.items() if k != '$id'})
+                continue
+
+            changes = diff_record(existing[key], _stringify_values(row))
+            changes.pop(key_field, None)
+            if changes:
+                updates.append({
+                    'updateKey': {'field': key_field, 'value': key},
+                    'record': {k: {'value': row[k]} for k in changes},
+                })
+
+        routes = [
+            self._portal.routes.add_records(app=self.app_id, records=chunk)
+            for chunk in _chunks(inserts, chunk_size)
+        ] + [
+            self._portal.routes.update_records(app=self.app_id, records=chunk)
+            for chunk in _chunks(updates, chunk_size)
+        ]
+
+        result = {'inserted': 0, 'updated': 0, 'unchanged': len(rows_by_key) - len(inserts) - len(updates), 'failed': 0, 'errors': []}
+        for route, response in zip(routes, handler.map(lambda route: route(), routes)):
+            count = len(route.opts['json']['records'])
+            if not response.is_success:
+                result['failed'] += count
+                result['errors'].append(KintoneAPIError(response))
+            elif route.method == 'POST':
+                result['inserted'] += count
+            else:
+                result['updated'] += count
+
+        return result
+
+    def update_statuses(self, updates: list[dict[str, Any]], chunk_size: int = 100, isolate_failures: bool = True) -> dict[str, dict[str, Any]]:
+        """Run process management actions on many records, in concurrent bulk requests
+
+        Args:
+            updates: Dicts with the record `id`, the `action` to run and an optional `assignee`
+                and `revision` (the update of a record fails if its revision has changed)
+            chunk_size: Records per bulk request (default: 100, the API maximum)
+            isolate_failures: Bulk requests are atomic, retry the records of a failed chunk one by one
+                so a single failing record does not fail the whole chunk (default: True)
+
+        Returns:
+            dict: New revision by record ID under `updated`, `KintoneAPIError` by record ID under `failed`
+
+        Example:
+            >>> app.update_statuses([{'id': 1, 'action': 'Approve'}, {'id': 2, 'action': 'Approve', 'revision': 4}])
+            {'updated': {'1': '7'}, 'failed': {'2': KintoneAPIError('[409] GAIA_CO02: ...')}}
+        """
+        handler = self._portal.handler
+        updates = [{**update, 'id': str(update['id'])} for update in updates]
+        result: dict[str, dict[str, Any]] = {'updated': {}, 'failed': {}}
+
+        def send_chunk(chunk: list[dict[str, Any]]) -> Response:
+            return self._portal.routes.update_statuses(app=self.app_id, records=chunk)()
+
+        def send_one(update: dict[str, Any]) -> Response:
+            return self._portal.routes.update_status(app=self.app_id, **update)()
+
+        retries: list[dict[str, Any]] = []
+        chunks = _chunks(updates, chunk_size)
+        for chunk, response in zip(chunks, handler.map(send_chunk, chunks)):
+            if response.is_success:
+                for record in json.loads(response.content)['records']:
+                    result['updated'][record['id']] = record['revision']
+            elif isolate_failures and len(chunk) > 1:
+                retries.extend(chunk)
+            else:
+                error = KintoneAPIError(response)
+                result['failed'].update((update['id'], error) for update in chunk)
+
+        for update, response in zip(retries, handler.map(send_one, retries)):
+            if response.is_success:
+                result['updated'][update['id']] = json.loads(response.content)['revision']
+            else:
+                result['failed'][update['id']] = KintoneAPIError(response)
+
+        return result
+
+    def update_assignees(self, assignments: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        """Set the assignees of the current status of many records, concurrently
+
+        Args:
+            assignments: Dicts with the record `id`, the login names of its `assignees`
+                and an optional `revision` (the update of a record fails if its revision has changed)
+
+        Returns:
+            dict: New revision by record ID under `updated`, `KintoneAPIError` by record ID under `failed`
+
+        Note:
+            The API updates the assignees of one record per request, requests run under the handler's concurrency limit
+        """
+        assignments = [{**assignment, 'id': str(assignment['id'])} for assignment in assignments]
+        result: dict[str, dict[str, Any]] = {'updated': {}, 'failed': {}}
+
+        def send(assignment: dict[str, Any]) -> Response:
+            return self._portal.routes.update_assignees(app=self.app_id, **assignment)()
+
+        for assignment, response in zip(assignments, self._portal.handler.map(send, assignments)):
+            if response.is_success:
+                result['updated'][assignment['id']] = json.loads(response.content)['revision']
+            else:
+                result['failed'][assignment['id']] = KintoneAPIError(response)
+
+        return result
+
+    def iter_comments(self, record_id: int | str, order: Literal['asc', 'desc'] = 'asc') -> Iterator[dict[str, Any]]:
+        """Yield the comments of a record, paging 10 comments per request
+
+        Raises:
+            KintoneAPIError: If a request fails
+        """
+        offset = 0
+        while True:
+            route = self._portal.routes.get_comments(app=self.app_id, record=record_id, order=order, offset=offset, limit=10)
+            response = route()
+            body: dict = json.loads(response.content)
+            if 'comments' not in body:
+                raise KintoneAPIError(response)
+
+            yield from body['comments']
+
+            # Ascending pages move towards newer comments, descending pages towards older ones
+            if not body['comments'] or not body.get('newer' if order == 'asc' else 'older'):
+                return
+            offset += len(body['comments'])
+
+    def get_comments(self, record_ids: Iterable[int | str], order: Literal['asc', 'desc'] = 'asc', batch_size: int = 100) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Stream the comments of many records, paging the records concurrently
+
+        Records are fetched `batch_size` at a time under the handler's concurrency limit, and the comments of
+        each batch are yielded before the next batch starts, so memory is bounded by the batch.
+
+        Args:
+            record_ids: IDs of the records
+            order: Order of the comments of each record (default: 'asc')
+            batch_size: Records fetched per batch (default: 100)
+
+        Yields:
+            tuple: `(record_id, comment)` for every comment, grouped by record in the order of `record_ids`
+
+        Raises:
+            KintoneAPIError: If a request fails
+
+        Example:
+            >>> for record_id, comment in app.get_comments(range(1, 100_001)):
+            ...     archive.write(record_id, comment['createdAt'], comment['text'])
+        """
+        record_ids = iter(record_ids)
+        while batch := [str(record_id) for record_id in itertools.islice(record_ids, batch_size)]:
+            comments = self._portal.handler.map(lambda record_id: list(self.iter_comments(record_id, order)), batch)
+            for record_id, record_comments in zip(batch, comments):
+                for comment in record_comments:
+                    yield record_id, comment
+
+    def add_comments(self, comments: list[dict[str, Any]]) -> dict[str, list[tuple[str, Any]]]:
+        """Post comments to many records concurrently
+
+        Comments to the same record are posted one after the other, in order.
+
+        Args:
+            comments: Dicts with the `record` ID, the comment `text` and optional `mentions`
+
+        Returns:
+            dict: `(record_id, comment_id)` tuples under `added`, `(record_id, KintoneAPIError)` tuples under `failed`
+
+        Example:
+            >>> app.add_comments([{'record': 1, 'text': 'Archived'}, {'record': 2, 'text': 'Archived'}])
+            {'added': [('1', '12'), ('2', '3')], 'failed': []}
+        """
+        by_record: dict[str, list[dict[str, Any]]] = {}
+        for comment in comments:
+            by_record.setdefault(str(comment['record']), []).append({k: v for k, v in comment.items() if k != 'record'})
+
+        def post(record_id: str) -> list[tuple[str, Any]]:
+            results = []
+            for comment in by_record[record_id]:
+                response = self._portal.routes.add_comment(app=self.app_id, record=record_id, comment=comment)()
+                results.append(json.loads(response.content)['id'] if response.is_success else KintoneAPIError(response))
+            return results
+
+        result: dict[str, list[tuple[str, Any]]] = {'added': [], 'failed': []}
+        for record_id, results in zip(by_record, self._portal.handler.map(post, list(by_record))):
+            for outcome in results:
+                result['failed' if isinstance(outcome, KintoneAPIError) else 'added'].append((record_id, outcome))
+        return result
+
+    def upload_file(self, file: str | os.PathLike | BinaryIO, filename: str = None, content_type: str = 'application/octet-stream') -> str:
+        """Upload a file, streaming it from disk or a file object in chunks
+
+        Args:
+            file: Path or binary file object to upload
+            filename: Name of the file in kintone (default: name of the path/file object)
+            content_type: MIME type of the file (default: 'application/octet-stream')
+
+        Returns:
+            str: The `fileKey` to set in a FILE field, e.g. `{'Attachments': [{'fileKey': key}]}`
+        """
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, 'rb') as f:
+                return self.upload_file(f, filename or os.path.basename(file), content_type)
+
+        filename = filename or os.path.basename(getattr(file, 'name', 'file'))
+        route = self._portal.routes.upload_file(file=(filename, file, content_type))
+        response = route()
+        if not response.is_success:
+            raise KintoneAPIError(response)
+
+        return response.json()['fileKey']
+
+    def download_file(self, file_key: str, dest: str | os.PathLike | BinaryIO, chunk_size: int = 64 * 1024) -> int:
+        """Download a file to a path or file object, streaming it in chunks of `chunk_size` bytes
+
+        Args:
+            file_key: The `fileKey` listed in the value of a FILE field
+            dest: Path or writable binary file object, paths are only written once the download completes
+            chunk_size: Bytes held in memory at a time (default: 64 KiB)
+
+        Returns:
+            int: Number of bytes written
+        """
+        route = self._portal.routes.download_file(fileKey=file_key)
+        with route.stream() as response:
+            if not response.is_success:
+                response.read()
+                raise KintoneAPIError(response)
+
+            if not isinstance(dest, (str, os.PathLike)):
+                return _copy_stream(response, dest, chunk_size)
+
+            partial = f'{os.fspath(dest)}.part'
+            try:
+                with open(partial, 'wb') as f:
+                    written = _copy_stream(response, f, chunk_size)
+                os.replace(partial, dest)
+            except BaseException:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+
+        return written
+
+    def download_attachments(self, records: list[dict[str, Any]], dest_dir: str | os.PathLike,
+                             fields: list[str] = None, max_workers: int = None) -> list[str]:
+        """Download every file attached to the records concurrently
+
+        Files are written to `<dest_dir>/<$id>/<field code>/<file name>`
+
+        Args:
+            records: Records as returned by `get_records` (must include `$id` and the FILE fields)
+            dest_dir: Directory to download into
+            fields: FILE field codes to download (default: every field holding attachments)
+            max_workers: Number of concurrent downloads (default: the handler's max_concurrency)
+
+        Returns:
+            list[str]: Paths of the downloaded files
+
+        Example:
+            >>> records = app.get_records(['Attachments'])
+            >>> app.download_attachments(records, 'backup/')
+            ['backup/1/Attachments/report.pdf', ...]
+        """
+        downloads: dict[str, str] = {}
+        for record in records:
+            for code, value in record.items():
+                if fields is not None and code not in fields:
+                    continue
+                if not (isinstance(value, list) and all(isinstance(v, dict) and 'fileKey' in v for v in value)):
+                    continue
+
+                directory = os.path.join(dest_dir, str(record['$id']), code)
+                for file in value:
+                    name = os.path.basename(file.get('name') or file['fileKey'])
+                    path = os.path.join(directory, name)
+
+                    # Files within a field can share a name
+                    stem, ext = os.path.splitext(name)
+                    copy = 1
+                    while path in downloads:
+                        path = os.path.join(directory, f'{stem} ({copy}){ext}')
+                        copy += 1
+                    downloads[path] = file['fileKey']
+
+        for directory in {os.path.dirname(path) for path in downloads}:
+            os.makedirs(directory, exist_ok=True)
+
+        self._portal.handler.map(self.download_file, downloads.values(), downloads.keys(), max_workers=max_workers)
+        return list(downloads)
+
+    def relations(self) -> dict[str, Relation]:
+        """Get the Lookup and Related Records relations of the App by field code"""
+        form = self.get_form_fields()
+        if form is None:
+            return None
+
+        return {
+            code: Relation.from_field(code, properties)
+            for code, properties in form['properties'].items()
+            if properties.get('lookup') or properties.get('type') == 'REFERENCE_TABLE'
+        }
+
+    def join(self, relation: Relation, parents: Iterable[dict[str, Any]] = None, fields: list[str] = None,
+             query: QueryString = QueryString(''), how: Literal['left', 'inner'] = 'left', key_batch_size: int = 100) -> Iterator[tuple[dict[str, Any], Any]]:
+        """Join records of this App with the records of a related App
+
+        Related records are fetched in batched `key in (...)` queries that run concurrently,
+        each key is fetched once and joined in memory, instead of one request per parent record.
+
+        Args:
+            relation: The relation to join on (see `relations()`)
+            parents: Parent records to join (default: the records matching `query`, streamed page by page)
+            fields: Parent field codes to fetch when streaming the parents (the relation key is always included)
+            query: Query the streamed parents must match
+            how: 'left' yields every parent, 'inner' skips parents without related records
+            key_batch_size: Keys per related records query (default: 100)
+
+        Yields:
+            tuple: `(parent, related)`, where related is the record (or None) for lookups
+                and the list of records for Related Records relations
+
+        Example:
+            >>> customer = app.relations()['Customer']
+            >>> for order, customer in app.join(customer, fields=['OrderNo']):
+            ...     print(order['OrderNo'], customer and customer['Name'])
+        """
+        if parents is None:
+            fields = list(dict.fromkeys([*(fields or []), relation.field]))
+            parents = (record for page in self.iter_record_pages(fields, query) for record in page)
+
+        related = KTApp(self._portal, relation.app)
+        return Join(related, relation, key_batch_size=key_batch_size)(parents, how)
+
     def get_form_fields(self) -> dict[str, Any]:
         """Gets the list of fields and field settings of an App."""
         route = self._portal.routes.get_form_fields(app=self.app_id)
@@ -195,4 +908,11 @@ class KTApp:
         if 'properties' not in response:
             return None
 
-        return response
\ No newline at end of file
+        return response
+
+def __getattr__(name: str):
+    # KTRecord is built on the model dataclasses, which are only imported once it is used
+    if name == 'KTRecord':
+        from .records import KTRecord
+        return KTRecord
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
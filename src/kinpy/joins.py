@@ -0,0 +1,152 @@
+"""Module for joining records across apps client-side
+
+Lookup and Related Records fields describe how records of one app relate to records of another.
+Rather than fetching the related records of every parent one request at a time, the join collects
+the keys of a batch of parents, fetches the related records in batched `key in (...)` queries
+(in parallel, each key only once) and hash-joins them in memory.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    Literal,
+    TYPE_CHECKING,
+)
+from dataclasses import dataclass
+from itertools import islice
+
+from .utils import QueryString
+
+if TYPE_CHECKING:
+    from .interfaces import KTApp
+
+@dataclass(frozen=True)
+class Relation:
+    """How records of a parent app relate to records of another app
+
+    Args:
+        app: ID of the related app
+        field: Field code on the parent holding the key
+        related_field: Field code on the related app matched against the key
+        fields: Related field codes to fetch
+        many: True if a parent can relate to many records (Related Records), False for a single record (Lookup)
+        filter: Additional query the related records must match (optional)
+
+    Example:
+        >>> relation = Relation(app=12, field='CustomerCode', related_field='Code', fields=('Code', 'Name'))
+    """
+    app: int | str
+    field: str
+    related_field: str
+    fields: tuple[str, ...] = ()
+    many: bool = False
+    filter: str = ''
+
+    @classmethod
+    def from_field(cls, code: str, properties: dict[str, Any]) -> Relation:
+        """Build a relation from a Lookup or Related Records field as returned by `KTApp.get_form_fields`
+
+        Raises:
+            ValueError: If the field is neither a Lookup nor a Related Records field
+        """
+        if properties.get('lookup'):
+            lookup = properties['lookup']
+            return cls(
+                app=lookup['relatedApp']['app'],
+                field=code,
+                related_field=lookup['relatedKeyField'],
+                fields=tuple(mapping['relatedField'] for mapping in lookup.get('fieldMappings', [])),
+            )
+
+        if properties.get('type') == 'REFERENCE_TABLE':
+            table = properties['referenceTable']
+            return cls(
+                app=table['relatedApp']['app'],
+                field=table['condition']['field'],
+                related_field=table['condition']['relatedField'],
+                fields=tuple(table.get('displayFields', [])),
+                many=True,
+                filter=table.get('filterCond', ''),
+            )
+
+        raise ValueError(f"Field {code} is not a Lookup or Related Records field")
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+class Join:
+    """Hash join of parent records with the records of a related app
+
+    Args:
+        app: The related app (its portal handler's concurrency limit applies to the lookups)
+        relation: The relation between the parent records and the related app
+        key_batch_size: Keys per `key in (...)` query (default: 100)
+        parent_batch_size: Parents held in memory while their keys are resolved (default: 2000)
+
+    Note:
+        Related records are cached per key for the lifetime of the Join, reuse the same Join to
+        avoid fetching keys again, or call `clear()` to bound memory between runs
+    """
+    def __init__(self, app: KTApp, relation: Relation, key_batch_size: int = 100, parent_batch_size: int = 2000) -> None:
+        self.app = app
+        self.relation = relation
+        self.key_batch_size = key_batch_size
+        self.parent_batch_size = parent_batch_size
+        self.cache: dict[str, list[dict[str, Any]]] = {}
+
+    def fetch(self, keys: Iterable[str]) -> None:
+        """Fetch and cache the related records of the keys that are not cached yet"""
+        missing = sorted({str(key) for key in keys} - self.cache.keys())
+        if not missing:
+            return
+
+        relation = self.relation
+        fields = list(dict.fromkeys([*relation.fields, relation.related_field]))
+
+        def lookup(batch: list[str]) -> list[dict[str, Any]]:
+            query = QueryString(relation.related_field).in_(*batch) & QueryString(relation.filter)
+            records = self.app.get_records(fields, query)
+            if records is None:
+                raise LookupError(f"Failed to fetch related records from app {relation.app}")
+            return records
+
+        for key in missing:
+            self.cache[key] = []
+        for records in self.app._portal.handler.map(lookup, list(_batched(missing, self.key_batch_size))):
+            for record in records:
+                self.cache.setdefault(str(record[relation.related_field]), []).append(record)
+
+    def __call__(self, parents: Iterable[dict[str, Any]], how: Literal['left', 'inner'] = 'left') -> Iterator[tuple[dict[str, Any], Any]]:
+        """Join parent records with their related records
+
+        Args:
+            parents: Parent records (any iterable, e.g. pages of `iter_record_pages` chained together)
+            how: 'left' yields every parent, 'inner' skips parents without related records
+
+        Yields:
+            tuple: `(parent, related)`, where related is the record (or None) for lookups
+                and the list of records for Related Records relations
+        """
+        field = self.relation.field
+        for batch in _batched(parents, self.parent_batch_size):
+            self.fetch(parent[field] for parent in batch if parent.get(field) not in (None, ''))
+
+            for parent in batch:
+                key = parent.get(field)
+                matches = self.cache.get(str(key), []) if key not in (None, '') else []
+                if not matches and how == 'inner':
+                    continue
+                if self.relation.many:
+                    yield parent, matches
+                else:
+                    yield parent, matches[0] if matches else None
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def __repr__(self):
+        return f'<Join app={self.relation.app} on {self.relation.field} = {self.relation.related_field} cached={len(self.cache)}>'
@@ -0,0 +1,115 @@
+"""Module for lazily loaded records
+
+Lazy records are fetched with only `$id` and a subset of their fields, the first access to any
+other field loads that field for every record of the same result set in batched `$id in (...)`
+queries, so only the fields that are actually used are downloaded.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Iterator,
+    TYPE_CHECKING,
+)
+from collections.abc import Mapping, Sequence
+
+import threading
+
+from .utils import QueryString
+
+if TYPE_CHECKING:
+    from .interfaces import KTApp
+
+class LazyRecord(Mapping):
+    """Read-only record that loads missing fields on access
+
+    Note:
+        Accessing a field that is not loaded yet loads it for every record of the
+        `LazyRecordSet` the record belongs to, not just for this record
+    """
+    __slots__ = ('_records', '_values')
+
+    def __init__(self, records: LazyRecordSet, values: dict[str, Any]) -> None:
+        self._records = records
+        self._values = values
+
+    @property
+    def id(self) -> str:
+        return self._values['$id']
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in self._values and field not in self._records.loaded:
+            self._records.load(field)
+        return self._values[field]
+
+    def __contains__(self, field: object) -> bool:
+        return field in self._values
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate the loaded fields"""
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Copy of the loaded fields"""
+        return dict(self._values)
+
+    def __repr__(self):
+        return f'<LazyRecord $id={self.id} loaded={list(self._values)}>'
+
+class LazyRecordSet(Sequence):
+    """Result set of lazy records sharing batched field loads
+
+    Args:
+        app: App the records belong to
+        records: Records as returned by `KTApp.get_records`, each must include `$id`
+        fields: Field codes already loaded for every record
+
+    Example:
+        >>> records = app.get_lazy_records(['Status'], QueryString('Status') == 'Open')
+        >>> [record['Amount'] for record in records]  # One batched load of Amount for all records
+    """
+    def __init__(self, app: KTApp, records: list[dict[str, Any]], fields: list[str] = ()) -> None:
+        self.app = app
+        self.loaded: set[str] = {'$id', *fields}
+        self._records = [LazyRecord(self, record) for record in records]
+        self._by_id = {record.id: record for record in self._records}
+        self._lock = threading.Lock()
+
+    def load(self, *fields: str) -> None:
+        """Load the fields for every record of the set
+
+        Raises:
+            KeyError: If the fields could not be fetched (e.g. an unknown field code)
+        """
+        with self._lock:
+            fields = [field for field in dict.fromkeys(fields) if field not in self.loaded]
+            if not fields or not self._records:
+                return
+
+            # `get_records` splits the `in (...)` list into queries of `max_in_values` ids and runs them concurrently
+            records = self.app.get_records(fields, QueryString('$id').in_(*self._by_id))
+            if records is None:
+                raise KeyError(f"Could not load fields {fields} of app {self.app.app_id}")
+
+            for values in records:
+                record = self._by_id.get(values['$id'])
+                if record is not None:
+                    record._values.update(values)
+            # Records deleted since the result set was fetched keep missing the fields
+            self.loaded.update(fields)
+
+    def __getitem__(self, index: int | slice) -> LazyRecord | list[LazyRecord]:
+        return self._records[index]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, id: int | str) -> LazyRecord | None:
+        """Get a record by `$id`"""
+        return self._by_id.get(str(id))
+
+    def __repr__(self):
+        return f'<LazyRecordSet app={self.app.app_id} records={len(self._records)} loaded={sorted(self.loaded)}>'
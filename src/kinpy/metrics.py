@@ -0,0 +1,214 @@
+"""Module for aggregating request metrics collected by the handlers"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Callable,
+)
+from bisect import bisect_left
+from dataclasses import dataclass, field, replace
+
+import threading
+
+# Upper bounds (seconds) of the latency histogram buckets, the last bucket catches everything else
+LatencyBuckets: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+# Status codes Kintone uses to signal that requests are being throttled
+ThrottleStatusCodes: frozenset[int] = frozenset({429, 503})
+
+@dataclass
+class EndpointStats:
+    """Running totals for a single (method, endpoint) pair"""
+    buckets: tuple[float, ...] = LatencyBuckets
+    requests: int = 0
+    errors: int = 0 # Requests that failed without a response
+    throttles: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    latency_sum: float = 0.0
+    latency_counts: list[int] = field(default=None)
+    status_codes: dict[int, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.latency_counts is None:
+            self.latency_counts = [0] * len(self.buckets)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a latency quantile (upper bound of the bucket it falls in)"""
+        target = q * self.requests
+        seen = 0
+        for bound, count in zip(self.buckets, self.latency_counts):
+            seen += count
+            if seen >= target and seen:
+                return bound
+        return 0.0
+
+    def copy(self) -> EndpointStats:
+        """Copy of the totals that later requests don't change"""
+        return replace(self, latency_counts=list(self.latency_counts), status_codes=dict(self.status_codes))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'throttles': self.throttles,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'status_codes': dict(self.status_codes),
+            'latency': {
+                'sum': self.latency_sum,
+                'buckets': dict(zip(self.buckets, self.latency_counts)),
+                'p50': self.quantile(0.50),
+                'p95': self.quantile(0.95),
+                'p99': self.quantile(0.99),
+            },
+        }
+
+class Metrics:
+    """In-process aggregation of request counts, latencies, sizes and status codes per endpoint and method
+
+    Pass an instance to a handler (or `KintonePortal`) to start collecting, handlers without
+    metrics skip instrumentation entirely.
+
+    Args:
+        buckets: Upper bounds (seconds) of the latency histogram buckets (optional)
+
+    Example:
+        >>> metrics = Metrics()
+        >>> kintone = KintonePortal('https://example.kintone.com', auth, metrics=metrics)
+        >>> KTApp(kintone, 1).get_records(['Text'])
+        >>> metrics.snapshot()['GET /k/v1/records.json']['requests']
+        3
+        >>> print(metrics.to_prometheus())
+        # TYPE kinpy_requests_total counter
+        kinpy_requests_total{method="GET",endpoint="/k/v1/records.json"} 3
+        ...
+    """
+    def __init__(self, buckets: tuple[float, ...] = LatencyBuckets) -> None:
+        if buckets[-1] != float('inf'):
+            buckets = (*buckets, float('inf'))
+
+        self.buckets = buckets
+        self.exporters: list[Callable[[dict[str, dict[str, Any]]], None]] = []
+        self._stats: dict[tuple[str, str], EndpointStats] = {}
+        self._gauges: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _get_stats(self, method: str, endpoint: str) -> EndpointStats:
+        # Callers must hold the lock
+        stats = self._stats.get((method, endpoint))
+        if stats is None:
+            stats = self._stats[(method, endpoint)] = EndpointStats(self.buckets)
+        return stats
+
+    def observe(self, method: str, endpoint: str, latency: float, status_code: int | None = None,
+                bytes_sent: int = 0, bytes_received: int = 0) -> None:
+        """Record a completed request, a `status_code` of None marks a request that failed without a response"""
+        with self._lock:
+            stats = self._get_stats(method, endpoint)
+            stats.requests += 1
+            stats.latency_sum += latency
+            stats.latency_counts[bisect_left(self.buckets, latency)] += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+
+            if status_code is None:
+                stats.errors += 1
+                return
+
+            stats.status_codes[status_code] = stats.status_codes.get(status_code, 0) + 1
+            if status_code in ThrottleStatusCodes:
+                stats.throttles += 1
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a value that goes up and down (e.g. the current concurrency limit)"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def gauges(self) -> dict[str, float]:
+        """Return a copy of the current gauge values, gauges are kept by `reset`"""
+        with self._lock:
+            return dict(self._gauges)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return a copy of the current metrics keyed by '<METHOD> <endpoint>'"""
+        with self._lock:
+            return {
+                f'{method} {endpoint}': stats.to_dict()
+                for (method, endpoint), stats in self._stats.items()
+            }
+
+    def reset(self) -> dict[str, dict[str, Any]]:
+        """Clear all metrics, returning the snapshot taken just before clearing"""
+        with self._lock:
+            snapshot = {
+                f'{method} {endpoint}': stats.to_dict()
+                for (method, endpoint), stats in self._stats.items()
+            }
+            self._stats = {}
+        return snapshot
+
+    def add_exporter(self, exporter: Callable[[dict[str, dict[str, Any]]], None]) -> None:
+        """Register a callback that receives a snapshot every time `export` is called"""
+        self.exporters.append(exporter)
+
+    def export(self, reset: bool = False) -> dict[str, dict[str, Any]]:
+        """Pass a snapshot to every registered exporter
+
+        Args:
+            reset: Clear the metrics after taking the snapshot, so each export only covers the last interval
+        """
+        snapshot = self.reset() if reset else self.snapshot()
+        for exporter in self.exporters:
+            exporter(snapshot)
+        return snapshot
+
+    def to_prometheus(self, prefix: str = 'kinpy') -> str:
+        """Render the current metrics in the Prometheus text exposition format"""
+        with self._lock:
+            # Copies, handlers keep updating the live stats while the text is rendered
+            stats = [(key, stats.copy()) for key, stats in self._stats.items()]
+            gauges = sorted(self._gauges.items())
+
+        lines = []
+        def metric(name: str, kind: str, samples: list[tuple[str, float]]):
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            lines.extend(f'{prefix}_{name}{labels} {value}' for labels, value in samples)
+
+        def labels(method: str, endpoint: str, **extra) -> str:
+            pairs = {'method': method, 'endpoint': endpoint, **extra}
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs.items()) + '}'
+
+        for name, attr in (
+            ('requests_total', 'requests'),
+            ('request_errors_total', 'errors'),
+            ('throttles_total', 'throttles'),
+            ('request_bytes_sent_total', 'bytes_sent'),
+            ('request_bytes_received_total', 'bytes_received'),
+        ):
+            metric(name, 'counter', [(labels(m, e), getattr(s, attr)) for (m, e), s in stats])
+
+        metric('responses_total', 'counter', [
+            (labels(m, e, status=code), count)
+            for (m, e), s in stats
+            for code, count in sorted(s.status_codes.items())
+        ])
+
+        lines.append(f'# TYPE {prefix}_request_duration_seconds histogram')
+        for (m, e), s in stats:
+            cumulative = 0
+            for bound, count in zip(s.buckets, s.latency_counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else bound
+                lines.append(f'{prefix}_request_duration_seconds_bucket{labels(m, e, le=le)} {cumulative}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{labels(m, e)} {s.latency_sum}')
+            lines.append(f'{prefix}_request_duration_seconds_count{labels(m, e)} {s.requests}')
+
+        for name, value in gauges:
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            lines.append(f'{prefix}_{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def __repr__(self):
+        return f'<Metrics endpoints={len(self._stats)}>'
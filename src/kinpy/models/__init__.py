@@ -2,12 +2,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from contextlib import contextmanager
+from copy import deepcopy
 from typing import (
+    Any,
     Optional,
     Literal,
 )
 
 from .fields import Field
+from ..diff import diff_record
 
 # Main datamodels for KinPy
 # Interfaces inherit the attributes defined here and implement methods for the API
@@ -16,12 +19,15 @@ from .fields import Field
 
 Unset = object()
 
-# Send the full object data back when updating a record
+# Only the data changed since the last snapshot is sent back when updating a record
 
 
 
 class Model:
     """Base of the datamodel, implements filtered access and defines methods used in interface implementation"""
+    # Kept out of __dict__ so change tracking is invisible to iteration
+    __slots__ = ('_snapshot',)
+
     def __getitem__(self, key):
         """Override getitem so only set values are returned"""
         val = super().__getattribute__(key)
@@ -29,7 +35,7 @@ class Model:
             return val
     
     def __getattribute__(self, name):
-        if name not in self and name in self.__dict__.keys():
+        if super().__getattribute__('__dict__').get(name) is Unset:
             # Value is Unset, return None/Falsy value
             return None
         
@@ -52,6 +58,28 @@ class Model:
         """Override contains so only set values are returned"""
         return key in self.__dict__ and self.__dict__[key] is not Unset
 
+    # Change tracking
+    def snapshot(self) -> None:
+        """Store a copy of the set values to diff against in `changes`"""
+        self._snapshot = {key: deepcopy(self.__dict__[key]) for key in self}
+
+    def changes(self) -> dict[str, Any]:
+        """Return the set values that differ from the last snapshot (all set values if there is none)"""
+        snapshot = getattr(self, '_snapshot', None)
+        if snapshot is None:
+            return {key: self.__dict__[key] for key in self}
+
+        return {
+            key: self.__dict__[key]
+            for key in self
+            if key not in snapshot or snapshot[key] != self.__dict__[key]
+        }
+
+    @property
+    def is_dirty(self) -> bool:
+        """True if any value changed since the last snapshot"""
+        return bool(self.changes())
+
     # Abstracts to be implemented with proper routing in interfaces
     def update(self) -> None: ...
 
@@ -60,9 +88,11 @@ class Model:
     @contextmanager
     def editor(self):
         """Context manager to allow updating a record.
-        Refreshes the record before entering the context and updates it after exiting
+        Refreshes the record before entering the context and updates it after exiting,
+        only values changed inside the context are sent
         """
         self.refresh()
+        self.snapshot()
         yield self
         self.update()
 
@@ -98,6 +128,13 @@ class RecordItem(Model):
 class Record(Model):
     record: dict[str, Field]
 
+    def changes(self) -> dict[str, Any]:
+        """Return the record fields that differ from the last snapshot (all fields if there is none)"""
+        snapshot = getattr(self, '_snapshot', None)
+        if snapshot is None or 'record' not in snapshot:
+            return dict(self.record)
+        return diff_record(snapshot['record'], self.record)
+
 @dataclass(eq=False)
 class UserId(Model):
     code: str = Unset
@@ -182,7 +219,7 @@ class Space(Model):
     showAppList: bool = Unset
     showMemberList: bool = Unset
     showRelatedLinkList: bool = Unset
-    permissions: SpacePermissions
+    permissions: SpacePermissions = Unset
 
 @dataclass(eq=False)
 class Thread(Model):
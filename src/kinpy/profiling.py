@@ -0,0 +1,200 @@
+"""Module for profiling the memory used by KinPy operations
+
+`MemoryProfiler` is a span collector that measures memory with `tracemalloc` at the start and end of
+every span, so the stages of a fetch are measured separately: the response bytes ('request'),
+the parsed JSON ('decode'), the unwrapped records ('transform', 'coerce') and the accumulated
+result ('get_records', 'accumulate').
+
+Per stage it reports the peak memory allocated while the stage ran and the memory (and number of
+allocated blocks) it left behind. Results can be written as JSON to check memory ceilings of jobs.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    TextIO,
+)
+from dataclasses import dataclass
+
+import json
+import sys
+import threading
+import tracemalloc
+
+from .tracing import Span
+
+@dataclass
+class _Active:
+    """Memory at the start of a running span"""
+    current: int
+    blocks: int | None
+    peak: int
+
+@dataclass
+class StageMemory:
+    """Memory totals of every span with the same path"""
+    count: int = 0
+    peak_max: int = 0
+    peak_total: int = 0
+    retained_max: int = 0
+    retained_total: int = 0
+    blocks_retained_max: int | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'count': self.count,
+            'peak_max': self.peak_max,
+            'peak_mean': self.peak_total / self.count if self.count else 0,
+            'retained_max': self.retained_max,
+            'retained_total': self.retained_total,
+            'blocks_retained_max': self.blocks_retained_max,
+        }
+
+def _blocks() -> int:
+    """Number of memory blocks currently allocated (and traced)
+
+    The snapshot is itself traced, the peak is reset afterwards so it does not count towards any span
+    """
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.reset_peak()
+    return blocks
+
+class MemoryProfiler:
+    """Collector measuring the peak and retained memory of each span with tracemalloc
+
+    Args:
+        frames: Frames stored per allocation, more frames give more precise `top` sites (default: 1)
+        count_blocks: Count the allocated blocks at span boundaries with tracemalloc snapshots,
+            slow for spans that run often (default: True)
+        top: Allocation sites holding the most memory to report when profiling stops (default: 10)
+
+    Note:
+        Peaks are process wide, a span's peak includes what other threads allocate while it runs.
+        Memory is counted in bytes and relative to the start of each span.
+
+    Example:
+        >>> profiler = MemoryProfiler()
+        >>> kintone = KintonePortal('https://example.kintone.com', auth, tracer=Tracer(profiler))
+        >>> with profiler:
+        ...     KTApp(kintone, 1).get_records(['Text'])
+        >>> profiler.print_summary()
+        get_records                 1x  peak   182.4MiB  retained    61.0MiB
+          page                    120x  peak     3.1MiB  retained     0.5MiB
+            decode                120x  peak     2.6MiB  retained     1.9MiB
+        ...
+        >>> profiler.write_json('memory.json')
+    """
+    def __init__(self, frames: int = 1, count_blocks: bool = True, top: int = 10) -> None:
+        self.frames = frames
+        self.count_blocks = count_blocks
+        self.top = top
+        self.stages: dict[tuple[str, ...], StageMemory] = {}
+        self.peak = 0
+        self.top_allocations: list[dict[str, Any]] = []
+        self._active: dict[Span, _Active] = {}
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start tracing allocations (spans before this are not measured)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+
+    def stop(self) -> None:
+        """Record the overall peak and top allocation sites, and stop tracing if `start` started it"""
+        if not tracemalloc.is_tracing():
+            return
+        with self._lock:
+            self._fold_peak()
+        if self.top:
+            statistics = tracemalloc.take_snapshot().statistics('lineno')[:self.top]
+            self.top_allocations = [
+                {'site': str(stat.traceback), 'size': stat.size, 'blocks': stat.count}
+                for stat in statistics
+            ]
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _fold_peak(self) -> int:
+        """Credit the peak since the last boundary to every running span, then reset it"""
+        # Callers must hold the lock
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        for active in self._active.values():
+            active.peak = max(active.peak, peak)
+        tracemalloc.reset_peak()
+        return current
+
+    def span_started(self, span: Span) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        with self._lock:
+            current = self._fold_peak()
+            blocks = _blocks() if self.count_blocks else None
+            self._active[span] = _Active(current, blocks, current)
+
+    def __call__(self, span: Span) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        with self._lock:
+            if span not in self._active: # Started before profiling, or a request phase
+                return
+            current = self._fold_peak()
+            active = self._active.pop(span)
+            blocks = _blocks() if active.blocks is not None else None
+
+            peak = active.peak - active.current
+            retained = current - active.current
+            stage = self.stages.setdefault(span.path, StageMemory())
+            stage.count += 1
+            stage.peak_max = max(stage.peak_max, peak)
+            stage.peak_total += peak
+            stage.retained_max = max(stage.retained_max, retained)
+            stage.retained_total += retained
+            if blocks is not None:
+                stage.blocks_retained_max = max(stage.blocks_retained_max or 0, blocks - active.blocks)
+
+    def __enter__(self) -> MemoryProfiler:
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def report(self) -> dict[str, Any]:
+        """Peak memory, memory per stage (by span path) and the top allocation sites"""
+        with self._lock:
+            return {
+                'peak': self.peak,
+                'stages': {'/'.join(path): stage.to_dict() for path, stage in sorted(self.stages.items())},
+                'top_allocations': list(self.top_allocations),
+            }
+
+    def write_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def summary(self) -> str:
+        """Render the stages as an indented tree with call counts, largest peak and largest retained memory"""
+        with self._lock:
+            stages = sorted(self.stages.items())
+        width = max((2 * (len(path) - 1) + len(path[-1]) for path, _ in stages), default=0) + 2
+
+        lines = []
+        for path, stage in stages:
+            label = '  ' * (len(path) - 1) + path[-1]
+            lines.append(f'{label:<{width}} {stage.count:>6}x  peak {stage.peak_max / 2**20:>8.1f}MiB'
+                         f'  retained {stage.retained_max / 2**20:>8.1f}MiB')
+        return '\n'.join(lines)
+
+    def print_summary(self, file: TextIO = None) -> None:
+        print(self.summary(), file=file or sys.stdout)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.stages.clear()
+            self.top_allocations = []
+            self.peak = 0
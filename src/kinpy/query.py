@@ -0,0 +1,441 @@
+"""Module for parsing Kintone query strings and evaluating them over local records
+
+Queries are parsed into an AST (`Condition`, `And`, `Or`, `Query`, ...) that renders back into Kintone's
+query language and compiles into Python predicates and sort keys, so records that are already in memory
+(a cache, a replica or an earlier result) can be filtered without a round trip.
+
+Example:
+    >>> query = compile_query('Status in ("Open", "In progress") and Amount > 100 order by Amount desc limit 10')
+    >>> query.apply(records)
+    [{'$id': '7', 'Status': 'Open', 'Amount': '250'}, ...]
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+)
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+import re
+
+# AST
+
+@dataclass(frozen=True)
+class Function:
+    """A query function call, e.g. TODAY() or FROM_TODAY(-7, DAYS)"""
+    name: str
+    args: tuple[str, ...] = ()
+
+    def __str__(self):
+        return f"{self.name}({', '.join(self.args)})"
+
+Value = str | Function
+
+def quote(value: Value) -> str:
+    """Render a value as a query literal"""
+    if isinstance(value, Function):
+        return str(value)
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+@dataclass(frozen=True)
+class Condition:
+    """A single field comparison
+
+    Attributes:
+        field: Field code
+        op: One of =, !=, <, >, <=, >=, like, not like, in, not in, is empty, is not empty
+        value: The compared value, a tuple of values for in/not in and None for is empty/is not empty
+    """
+    field: str
+    op: str
+    value: Value | tuple[Value, ...] | None = None
+
+    def __str__(self):
+        if self.value is None:
+            return f'{self.field} {self.op}'
+        if isinstance(self.value, tuple):
+            return f"{self.field} {self.op} ({', '.join(quote(v) for v in self.value)})"
+        return f'{self.field} {self.op} {quote(self.value)}'
+
+@dataclass(frozen=True)
+class And:
+    terms: tuple[Node, ...]
+
+    def __str__(self):
+        return ' and '.join(f'({term})' if isinstance(term, (And, Or)) else str(term) for term in self.terms)
+
+@dataclass(frozen=True)
+class Or:
+    terms: tuple[Node, ...]
+
+    def __str__(self):
+        return ' or '.join(f'({term})' if isinstance(term, (And, Or)) else str(term) for term in self.terms)
+
+Node = Condition | And | Or
+
+@dataclass(frozen=True)
+class OrderBy:
+    field: str
+    descending: bool = False
+
+    def __str__(self):
+        return f"{self.field} {'desc' if self.descending else 'asc'}"
+
+@dataclass(frozen=True)
+class Query:
+    """A full query: an optional condition followed by order by, limit and offset clauses"""
+    condition: Node | None = None
+    order_by: tuple[OrderBy, ...] = ()
+    limit: int | None = None
+    offset: int | None = None
+
+    def __str__(self):
+        parts = [str(self.condition)] if self.condition is not None else []
+        if self.order_by:
+            parts.append(f"order by {', '.join(str(order) for order in self.order_by)}")
+        if self.limit is not None:
+            parts.append(f'limit {self.limit}')
+        if self.offset is not None:
+            parts.append(f'offset {self.offset}')
+        return ' '.join(parts)
+
+# Parser
+
+_Token = re.compile(r'''
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op><=|>=|!=|=|<|>)
+      | (?P<punct>[(),])
+      | (?P<word>[^\s()<>=!,"']+)
+    )''', re.VERBOSE)
+
+_Keywords = {'and', 'or', 'not', 'in', 'like', 'is', 'empty', 'order', 'by', 'asc', 'desc', 'limit', 'offset'}
+
+def _tokenize(query: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    query = query.rstrip()
+    while position < len(query):
+        match = _Token.match(query, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Invalid query syntax at position {position}: {query[position:position + 20]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+class _Parser:
+    def __init__(self, query: str) -> None:
+        self.query = query
+        self.tokens = _tokenize(query)
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> tuple[str | None, str | None]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def keyword(self, offset: int = 0) -> str | None:
+        kind, text = self.peek(offset)
+        return text.lower() if kind == 'word' and text.lower() in _Keywords else None
+
+    def next(self) -> tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise ValueError(f"Unexpected end of query: {self.query!r}")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def expect(self, text: str) -> None:
+        kind, token = self.next()
+        if token.lower() != text:
+            raise ValueError(f"Expected {text!r} but found {token!r} in query: {self.query!r}")
+
+    def parse(self) -> Query:
+        condition = None
+        if self.peek()[0] is not None and self.keyword() not in ('order', 'limit', 'offset'):
+            condition = self.parse_or()
+
+        order_by = []
+        if self.keyword() == 'order':
+            self.next()
+            self.expect('by')
+            while True:
+                field = self.field()
+                descending = False
+                if self.keyword() in ('asc', 'desc'):
+                    descending = self.next()[1].lower() == 'desc'
+                order_by.append(OrderBy(field, descending))
+                if self.peek()[1] != ',':
+                    break
+                self.next()
+
+        limit = offset = None
+        while self.keyword() in ('limit', 'offset'):
+            clause = self.next()[1].lower()
+            value = int(self.next()[1])
+            if clause == 'limit':
+                limit = value
+            else:
+                offset = value
+
+        if self.peek()[0] is not None:
+            raise ValueError(f"Unexpected {self.peek()[1]!r} in query: {self.query!r}")
+        return Query(condition, tuple(order_by), limit, offset)
+
+    def parse_or(self) -> Node:
+        terms = [self.parse_and()]
+        while self.keyword() == 'or':
+            self.next()
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else Or(tuple(terms))
+
+    def parse_and(self) -> Node:
+        terms = [self.parse_factor()]
+        while self.keyword() == 'and':
+            self.next()
+            terms.append(self.parse_factor())
+        return terms[0] if len(terms) == 1 else And(tuple(terms))
+
+    def parse_factor(self) -> Node:
+        if self.peek()[1] == '(':
+            self.next()
+            node = self.parse_or()
+            self.expect(')')
+            return node
+        return self.parse_condition()
+
+    def field(self) -> str:
+        kind, text = self.next()
+        if kind != 'word' or text.lower() in _Keywords:
+            raise ValueError(f"Expected a field code but found {text!r} in query: {self.query!r}")
+        return text
+
+    def parse_condition(self) -> Condition:
+        field = self.field()
+        kind, text = self.next()
+        if kind == 'op':
+            return Condition(field, text, self.value())
+
+        op = text.lower()
+        if op == 'not':
+            op = f'not {self.next()[1].lower()}'
+        if op in ('like', 'not like'):
+            return Condition(field, op, self.value())
+        if op in ('in', 'not in'):
+            self.expect('(')
+            values = [self.value()]
+            while self.peek()[1] == ',':
+                self.next()
+                values.append(self.value())
+            self.expect(')')
+            return Condition(field, op, tuple(values))
+        if op == 'is':
+            if self.keyword() == 'not':
+                self.next()
+                op = 'is not'
+            self.expect('empty')
+            return Condition(field, f'{op} empty')
+
+        raise ValueError(f"Unknown operator {text!r} in query: {self.query!r}")
+
+    def value(self) -> Value:
+        kind, text = self.next()
+        if kind == 'string':
+            return re.sub(r'\\(.)', r'\1', text[1:-1])
+        if kind != 'word':
+            raise ValueError(f"Expected a value but found {text!r} in query: {self.query!r}")
+
+        if self.peek()[1] == '(':
+            # Function call, e.g. FROM_TODAY(-7, DAYS)
+            self.next()
+            args = []
+            while self.peek()[1] != ')':
+                args.append(self.next()[1])
+                if self.peek()[1] == ',':
+                    self.next()
+            self.next()
+            return Function(text.upper(), tuple(args))
+        return text
+
+def parse_query(query: str) -> Query:
+    """Parse a Kintone query string into a `Query` AST
+
+    Raises:
+        ValueError: If the query is not valid
+    """
+    # QueryString keeps its built query in `.query`
+    return _Parser(str(getattr(query, 'query', query))).parse()
+
+# Evaluation
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+_Units = {'DAYS': 1, 'WEEKS': 7}
+
+# Functions that can be resolved to a literal locally (e.g. LOGINUSER() needs the session and is unsupported)
+QueryFunctions: dict[str, Callable[..., str]] = {
+    'TODAY': lambda: _today().isoformat(),
+    'YESTERDAY': lambda: (_today() - timedelta(days=1)).isoformat(),
+    'TOMORROW': lambda: (_today() + timedelta(days=1)).isoformat(),
+    'NOW': lambda: datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    'FROM_TODAY': lambda n, unit='DAYS': (_today() + timedelta(days=int(n) * _Units[unit.upper()])).isoformat(),
+}
+
+def _resolve(value: Value) -> str:
+    if not isinstance(value, Function):
+        return value
+    if value.name not in QueryFunctions:
+        raise ValueError(f"Query function {value.name}() cannot be evaluated locally")
+    return QueryFunctions[value.name](*value.args)
+
+def _number(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+_Date = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+def _getter(field: str) -> Callable[[Any], Any]:
+    """Build an accessor for simplified records, raw API records ({'value': ...}) and models"""
+    def get(record: Any) -> Any:
+        value = record.get(field) if isinstance(record, dict) else getattr(record, field, None)
+        if isinstance(value, dict) and 'value' in value:
+            return value['value']
+        return value
+    return get
+
+def _scalars(value: Any) -> list[str]:
+    """Flatten a field value into comparable strings (selection fields hold lists, user fields hold {'code', 'name'})"""
+    if isinstance(value, list):
+        return [str(v['code']) if isinstance(v, dict) else str(v) for v in value]
+    if value is None:
+        return []
+    return [str(value)]
+
+def _comparator(op: str, literal: str) -> Callable[[str], bool]:
+    """Build a comparison of a single string value against a literal, numeric if both sides are numbers"""
+    number = _number(literal)
+    is_date = bool(_Date.match(literal))
+
+    def compare(value: str) -> bool:
+        # DATETIME values compared to a date are compared by day
+        if is_date and len(value) > 10 and value[10] == 'T':
+            value = value[:10]
+
+        left, right = value, literal
+        if number is not None:
+            value_number = _number(value)
+            if value_number is not None:
+                left, right = value_number, number
+
+        if op == '=':
+            return left == right
+        if op == '<':
+            return left < right
+        if op == '>':
+            return left > right
+        if op == '<=':
+            return left <= right
+        return left >= right
+    return compare
+
+def compile_condition(node: Node) -> Callable[[Any], bool]:
+    """Compile a condition into a predicate over records"""
+    if isinstance(node, And):
+        predicates = [compile_condition(term) for term in node.terms]
+        return lambda record: all(predicate(record) for predicate in predicates)
+
+    if isinstance(node, Or):
+        predicates = [compile_condition(term) for term in node.terms]
+        return lambda record: any(predicate(record) for predicate in predicates)
+
+    get = _getter(node.field)
+    op = node.op
+
+    if op in ('is empty', 'is not empty'):
+        empty = op == 'is empty'
+        return lambda record: (get(record) in (None, '', [])) is empty
+
+    if op in ('in', 'not in'):
+        members = {_resolve(value) for value in node.value}
+        negated = op == 'not in'
+        return lambda record: any(v in members for v in _scalars(get(record))) is not negated
+
+    literal = _resolve(node.value)
+    if op in ('like', 'not like'):
+        needle = literal.casefold()
+        negated = op == 'not like'
+        return lambda record: any(needle in v.casefold() for v in _scalars(get(record))) is not negated
+
+    if op == '!=':
+        equal = _comparator('=', literal)
+        return lambda record: not any(equal(v) for v in _scalars(get(record)))
+
+    if op not in ('=', '<', '>', '<=', '>='):
+        raise ValueError(f"Unknown operator {op!r}")
+    compare = _comparator(op, literal)
+    return lambda record: any(compare(v) for v in _scalars(get(record)))
+
+def _sort_key(field: str) -> Callable[[Any], tuple]:
+    get = _getter(field)
+
+    def key(record: Any) -> tuple:
+        value = get(record)
+        if value in (None, '', []):
+            return (0, 0, '')
+        number = _number(value)
+        if number is not None:
+            return (1, number, '')
+        return (2, 0, ', '.join(_scalars(value)))
+    return key
+
+class CompiledQuery:
+    """A query compiled into a predicate and sort keys, applied to records in memory
+
+    Args:
+        query: Query string, `QueryString` or parsed `Query`
+    """
+    def __init__(self, query: str | Query) -> None:
+        self.query = query if isinstance(query, Query) else parse_query(query)
+        self.predicate: Callable[[Any], bool] = (
+            compile_condition(self.query.condition)
+            if self.query.condition is not None
+            else lambda record: True
+        )
+        self.sort_keys = [(_sort_key(order.field), order.descending) for order in self.query.order_by]
+
+    def filter(self, records: Iterable[Any]) -> Iterable[Any]:
+        """Lazily yield the records matching the condition (ignores order by, limit and offset)"""
+        return filter(self.predicate, records)
+
+    def apply(self, records: Iterable[Any]) -> list[Any]:
+        """Return the matching records, sorted and sliced like the server would"""
+        result = list(self.filter(records))
+
+        # Stable sorts applied from the last key to the first give a multi-key sort with mixed directions
+        for key, descending in reversed(self.sort_keys):
+            result.sort(key=key, reverse=descending)
+
+        start = self.query.offset or 0
+        end = start + self.query.limit if self.query.limit is not None else None
+        return result[start:end]
+
+    def __call__(self, record: Any) -> bool:
+        return self.predicate(record)
+
+    def __repr__(self):
+        return f'<CompiledQuery {self.query}>'
+
+def compile_query(query: str | Query) -> CompiledQuery:
+    """Compile a Kintone query string for local evaluation
+
+    Raises:
+        ValueError: If the query is not valid or uses a function that cannot be evaluated locally
+    """
+    return CompiledQuery(query)
@@ -0,0 +1,188 @@
+"""Module for recording API traffic and replaying it offline
+
+`TrafficRecorder` captures every request a handler makes (route, parameters, status, response size,
+latency and optionally the response body) to a gzip compressed JSON lines file, with credentials
+redacted. `ReplayTransport` serves the recorded responses to a `KintonePortal` with the original or
+scaled latencies, so changes to paging, decoding and models can be measured against real workloads.
+
+Example:
+    >>> with TrafficRecorder('orders.jsonl.gz') as recorder:
+    ...     kintone = KintonePortal('https://example.kintone.com', auth, recorder=recorder)
+    ...     run_workload(kintone)
+
+    >>> kintone = KintonePortal('https://example.kintone.com', auth, transport=ReplayTransport('orders.jsonl.gz'))
+    >>> run_workload(kintone)  # No network, same responses and latencies
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+)
+from collections import deque
+
+import asyncio
+import base64
+import gzip
+import json
+import threading
+import time
+
+from httpx import AsyncBaseTransport, BaseTransport, ByteStream, Request, RequestNotRead, Response
+
+# Headers never written to a recording
+RedactedHeaders: set[str] = {'x-cybozu-api-token', 'x-cybozu-authorization', 'authorization', 'cookie', 'set-cookie'}
+
+# Request headers kept in a recording, they change how Kintone answers a request
+_KeptRequestHeaders: set[str] = {'x-http-method-override', 'content-type'}
+
+def _request_body(request: Request) -> Any:
+    """JSON request body (None for other bodies, e.g. file uploads)"""
+    if 'json' not in request.headers.get('content-type', ''):
+        return None
+    try:
+        content = request.content
+    except RequestNotRead: # Streamed by the transport without being kept
+        return None
+    if not content:
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        return None
+
+def _request_key(method: str, path: str, params: dict[str, Any], body: Any) -> str:
+    return json.dumps([method, path, params, body], sort_keys=True, ensure_ascii=False)
+
+class TrafficRecorder:
+    """Writes the requests made by a handler to a gzip compressed JSON lines file
+
+    Args:
+        path: File to write (overwritten)
+        bodies: Record response bodies, needed to replay the recording (default: True)
+        redact: Extra header names to redact (credentials are always redacted)
+
+    Note:
+        Pass the recorder to a handler (or `KintonePortal`) with `recorder=`, and close it
+        (or use it as a context manager) to finish the file
+    """
+    def __init__(self, path: str, bodies: bool = True, redact: Iterable[str] = ()) -> None:
+        self.path = path
+        self.bodies = bodies
+        self.redact = RedactedHeaders | {header.lower() for header in redact}
+        self.requests = 0
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, response: Response, start: float, latency: float, streamed: bool = False) -> None:
+        """Record a finished request
+
+        Args:
+            response: The response, with its request
+            start: `time.perf_counter()` when the request was sent
+            latency: Seconds until the response was read
+            streamed: The body was streamed to the caller and is not recorded
+        """
+        request = response.request
+        entry: dict[str, Any] = {
+            'at': round(start - self._start, 6),
+            'method': request.method,
+            'path': request.url.path,
+            'params': dict(request.url.params),
+            'headers': {
+                name: value for name, value in request.headers.items()
+                if name.lower() in _KeptRequestHeaders and name.lower() not in self.redact
+            },
+            'body': _request_body(request),
+            'status': response.status_code,
+            'content_type': response.headers.get('content-type', ''),
+            'size': response.num_bytes_downloaded if streamed else len(response.content),
+            'latency': round(latency, 6),
+        }
+        if self.bodies and not streamed:
+            try:
+                entry['response'] = response.content.decode('utf-8')
+            except UnicodeDecodeError:
+                entry['response_b64'] = base64.b64encode(response.content).decode('ascii')
+
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self.requests += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> TrafficRecorder:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self):
+        return f'<TrafficRecorder {self.path} requests={self.requests}>'
+
+def read_recording(path: str) -> Iterator[dict[str, Any]]:
+    """Yield the entries of a recording"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class ReplayTransport(BaseTransport, AsyncBaseTransport):
+    """Serves recorded responses, for sync and async clients
+
+    Requests are matched on method, path, query parameters and JSON body. Repeated requests are
+    answered in recorded order, the last response is reused once they run out.
+
+    Args:
+        path: Recording written by `TrafficRecorder` (with bodies)
+        latency_scale: Multiplier of the recorded latencies, 0 to answer immediately (default: 1.0)
+
+    Attributes:
+        misses: Requests that did not match the recording (answered with a 404)
+    """
+    def __init__(self, path: str, latency_scale: float = 1.0) -> None:
+        self.latency_scale = latency_scale
+        self.misses: list[str] = []
+        self._responses: dict[str, deque[dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+        for entry in read_recording(path):
+            key = _request_key(entry['method'], entry['path'], entry['params'], entry['body'])
+            self._responses.setdefault(key, deque()).append(entry)
+
+    def _match(self, request: Request) -> tuple[Response, float]:
+        key = _request_key(request.method, request.url.path, dict(request.url.params), _request_body(request))
+
+        with self._lock:
+            entries = self._responses.get(key)
+            if not entries:
+                self.misses.append(key)
+                return Response(404, json={'code': 'REPLAY_MISS', 'message': f'No recorded response for {request.method} {request.url.path}'}), 0.0
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+
+        if 'response' in entry:
+            content = entry['response'].encode('utf-8')
+        elif 'response_b64' in entry:
+            content = base64.b64decode(entry['response_b64'])
+        else:
+            return Response(501, json={'code': 'REPLAY_NO_BODY', 'message': 'Recording was made without bodies'}), 0.0
+
+        response = Response(entry['status'], headers={'content-type': entry['content_type']}, stream=ByteStream(content))
+        return response, entry['latency'] * self.latency_scale
+
+    def handle_request(self, request: Request) -> Response:
+        response, latency = self._match(request)
+        if latency:
+            time.sleep(latency)
+        return response
+
+    async def handle_async_request(self, request: Request) -> Response:
+        response, latency = self._match(request)
+        if latency:
+            await asyncio.sleep(latency)
+        return response
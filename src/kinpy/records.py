@@ -0,0 +1,68 @@
+"""Record interface, kept apart from `interfaces` so the model dataclasses are only imported when it is used"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    TYPE_CHECKING,
+)
+
+from .models import Record
+
+if TYPE_CHECKING:
+    from .interfaces import KTApp
+
+class KTRecord(Record):
+    """Record interface with change tracking, only modified fields are sent on update
+
+    Args:
+        app: The app the record belongs to
+        id: The record $id
+        record: Already fetched record data, fetched on `refresh` if not specified (optional)
+
+    Note:
+        The record revision is checked on update (optimistic concurrency),
+        set `revision` to None to overwrite regardless of concurrent edits
+
+    Example:
+        >>> record = KTRecord(app, 1)
+        >>> with record.editor():
+        ...     record.record['Status'] = 'Done' # Only 'Status' is sent
+    """
+    __slots__ = ('app', 'id', 'revision')
+
+    def __init__(self, app: KTApp, id: int | str, record: dict[str, Any] = None) -> None:
+        super().__init__(record=record if record is not None else {})
+        self.app = app
+        self.id = id
+        self.revision = None
+
+        if record is not None:
+            self.revision = record.get('$revision')
+            self.snapshot()
+
+    def refresh(self) -> None:
+        """Fetch the current record data and take a new snapshot"""
+        record = self.app.get_record(self.id)
+        if record is None:
+            raise LookupError(f"Record {self.id} not found in app {self.app.app_id}")
+
+        self.record = record
+        self.revision = record.get('$revision')
+        self.snapshot()
+
+    def update(self) -> dict[str, Any] | None:
+        """Send the fields changed since the last snapshot (no request is made if nothing changed)"""
+        changes = {k: v for k, v in self.changes().items() if k not in ('$id', '$revision')}
+        if not changes:
+            return None
+
+        response = self.app.update_record({'$id': self.id, **changes}, revision=self.revision)
+        if 'revision' in response:
+            self.revision = response['revision']
+            self.record['$revision'] = response['revision']
+        self.snapshot()
+
+        return response
+
+    def __repr__(self):
+        return f'<KTRecord {self.id} app={self.app.app_id} revision={self.revision}>'
@@ -6,6 +6,7 @@ from typing import (
     Any,
 )
 from functools import wraps
+from contextlib import AbstractContextManager, AbstractAsyncContextManager
 from httpx import Response
 
 import json
@@ -28,6 +29,9 @@ class Route:
        
     def __call__(self) -> Response | Coroutine[Any, Any, Response]:
         raise NotImplementedError("Route must be subclassed as SyncRoute or AsyncRoute")
+
+    def stream(self) -> AbstractContextManager[Response] | AbstractAsyncContextManager[Response]:
+        raise NotImplementedError("Route must be subclassed as SyncRoute or AsyncRoute")
     
     def __repr__(self):
         return f'<Route {self.method} {self.endpoint} for {self.handler}>'
@@ -75,6 +79,18 @@ class SyncRoute(Route):
             return self.handler.delete(self.url, **self.opts)   
         return None
 
+    def stream(self) -> AbstractContextManager[Response]:
+        """Make the request without reading the response body
+
+        Example:
+            >>> with route.stream() as response:
+            ...     for chunk in response.iter_bytes():
+            ...         ...
+        """
+        if not isinstance(self.handler, HTTPX_Sync):
+            raise AttributeError("Sync Routing requires a Sync Handler")
+        return self.handler.stream(self.method, self.url, **self.opts)
+
 class AsyncRoute(Route):
     """Async Route
     
@@ -118,6 +134,18 @@ class AsyncRoute(Route):
             return await self.handler.delete(self.url, **self.opts)   
         return None
 
+    def stream(self) -> AbstractAsyncContextManager[Response]:
+        """Make the request without reading the response body
+
+        Example:
+            >>> async with route.stream() as response:
+            ...     async for chunk in response.aiter_bytes():
+            ...         ...
+        """
+        if not isinstance(self.handler, HTTPX_Async):
+            raise AttributeError("Async Routing requires an Async Handler")
+        return self.handler.stream(self.method, self.url, **self.opts)
+
 class Routes:
     """Class for defining Kintone REST API endpoints
     
@@ -146,6 +174,7 @@ class Routes:
                        required: list[str] = None, 
                        optional: list[str] = None,
                        json_content: bool = False,
+                       multipart: bool = False,
                        **opts) -> Route:
         """Define a route using a function header and type hints
         
@@ -154,6 +183,8 @@ class Routes:
             endpoint: The api endpoint minus the base url of the handler
             required: Required parameter keys
             optional: Optional parameter keys
+            json_content: Send the parameters as a JSON body instead of query parameters
+            multipart: Send the parameters as a multipart file upload instead of query parameters
             opts: Optional parameters to pass to the Handler request method
         
         Raises:
@@ -233,13 +264,26 @@ class Routes:
                             )
                 
                 # TODO: Come up with a more elegant solution here; get requests to not accept a json body, but some put requests require it.
-                if isinstance(self.handler, HTTPX_Sync) and json_content:
-                    return SyncRoute(method, endpoint, self.handler, json=params, **opts)
-                elif isinstance(self.handler, HTTPX_Sync):
-                    return SyncRoute(method, endpoint, self.handler, params=params, **opts)
+                if json_content:
+                    content = {'json': params}
+                elif multipart:
+                    content = {'files': params}
+                else:
+                    # Arrays are sent as indexed query parameters (e.g. ids[0]=1&ids[1]=2)
+                    content = {'params': {
+                        key: item
+                        for param, value in params.items()
+                        for key, item in (
+                            ((f'{param}[{i}]', v) for i, v in enumerate(value))
+                            if isinstance(value, (list, tuple)) else ((param, value),)
+                        )
+                    }}
+
+                if isinstance(self.handler, HTTPX_Sync):
+                    return SyncRoute(method, endpoint, self.handler, **content, **opts)
                 
                 if isinstance(self.handler, HTTPX_Async):
-                    return AsyncRoute(method, endpoint, self.handler, params=params, **opts)
+                    return AsyncRoute(method, endpoint, self.handler, **content, **opts)
                 
                 raise AttributeError("Invalid Handler type, must be `HTTPX_Sync` or `HTTPX_Async`")
                 
@@ -259,7 +303,7 @@ class Routes:
         ...
 
     @register_route('GET', '/k/v1/apps.json', optional=['ids', 'codes', 'name', 'spaceIds', 'limit', 'offset'])
-    def get_apps(self, ids: list[int | str], codes: list[str], name: str, spaceIds: list[int | str], limit: int, offset: int) -> Route: 
+    def get_apps(self, ids: list, codes: list, name: str, spaceIds: list, limit: int, offset: int) -> Route: 
         """Get Apps that match the specified criteria
         
         Args:
@@ -271,8 +315,8 @@ class Routes:
             offset: The offset of the apps to get (default: 0, max: 2147483647) (optional)
         
         Note:
-            All parameters are optional, but at least one must be specified for the request to be valid
-            Currently unused; requires user/pass auth, rather than API key
+            All parameters are optional, without any all Apps the user can view are returned (paged by limit/offset)
+            Requires user/pass auth, rather than API key
         """
         ...
 
@@ -299,6 +343,16 @@ class Routes:
         """
         ...
 
+    @register_route('POST', '/k/v1/records.json', required=['app'], optional=['fields', 'query', 'totalCount'],
+                    json_content=True, headers={'X-HTTP-Method-Override': 'GET'})
+    def get_records_override(self, app: int | str, fields: str, query: str, totalCount: bool | str) -> Route:
+        """Get a list of records, sending the parameters in the request body (limit 500 per request)
+
+        Same as `get_records`, but sent as a POST with `X-HTTP-Method-Override: GET`
+        so queries too long for a URL can be used.
+        """
+        ...
+
     @register_route('POST', '/k/v1/record.json', required=['app', 'record'], json_content=True)
     def add_record(self, app: int | str, record: dict) -> Route:
         """Creates a new record within specified app
@@ -309,18 +363,18 @@ class Routes:
         """
         ...
     
-    @register_route('POST', '/k/v1/records.json', required=['app', 'records'])
-    def add_records(self, app: int | str, record: str) -> Route:
-        """Creates a new record within specified app
+    @register_route('POST', '/k/v1/records.json', required=['app', 'records'], json_content=True)
+    def add_records(self, app: int | str, records: list) -> Route:
+        """Creates new records within specified app (limit 100 per request)
         
         Args:
-            app: App ID to retrieve record from
-            record: List of JSON objects representing records
+            app: App ID to add records to
+            records: List of JSON objects representing records
         """
         ...
 
     @register_route('PUT', '/k/v1/record.json', required=[], optional=['app', 'record', 'id', 'updateKey', 'revision'], json_content=True)
-    def update_record(self, app: str | int, record: dict, id: str | int, updateKey, revision) -> Route:
+    def update_record(self, app: str | int, record: dict, id: str | int, updateKey: dict, revision: int | str) -> Route:
         """Updates specified record within app database
         Args:
             app: App ID to update
@@ -340,6 +394,105 @@ class Routes:
         """
         ...
 
+    @register_route('PUT', '/k/v1/records.json', required=['app', 'records'], json_content=True)
+    def update_records(self, app: str | int, records: list) -> Route:
+        """Updates multiple records within app database (limit 100 per request)
+
+        Args:
+            app: App ID to update
+            records: List of JSON objects, each with `id` (or `updateKey`), `record` and an optional `revision`
+
+        Note:
+            The request is atomic, if any record fails to update none of the records are updated
+        """
+        ...
+
+    @register_route('PUT', '/k/v1/record/status.json', required=['app', 'id', 'action'], optional=['assignee', 'revision'], json_content=True)
+    def update_status(self, app: str | int, id: str | int, action: str, assignee: str, revision: int | str) -> Route:
+        """Runs a process management action on a record
+
+        Args:
+            app: App ID of the record
+            id: Record ID
+            action: Name of the action to run (as displayed on the action button)
+            assignee: Login name of the next assignee, if the next status lets the user choose (optional)
+            revision: Expected revision of the record, the update fails if it has changed (optional)
+        """
+        ...
+
+    @register_route('PUT', '/k/v1/records/status.json', required=['app', 'records'], json_content=True)
+    def update_statuses(self, app: str | int, records: list) -> Route:
+        """Runs process management actions on multiple records (limit 100 per request)
+
+        Args:
+            app: App ID of the records
+            records: List of JSON objects, each with `id`, `action` and an optional `assignee` and `revision`
+
+        Note:
+            The request is atomic, if any record fails to update none of the records are updated
+        """
+        ...
+
+    @register_route('PUT', '/k/v1/record/assignees.json', required=['app', 'id', 'assignees'], optional=['revision'], json_content=True)
+    def update_assignees(self, app: str | int, id: str | int, assignees: list, revision: int | str) -> Route:
+        """Updates the assignees of a record's current status
+
+        Args:
+            app: App ID of the record
+            id: Record ID
+            assignees: Login names of the assignees (up to 100, empty to clear them)
+            revision: Expected revision of the record, the update fails if it has changed (optional)
+        """
+        ...
+
+    @register_route('GET', '/k/v1/record/comments.json', required=['app', 'record'], optional=['order', 'offset', 'limit'])
+    def get_comments(self, app: str | int, record: str | int, order: str, offset: int, limit: int) -> Route:
+        """Get the comments of a record (limit 10 per request)
+
+        Args:
+            app: App ID of the record
+            record: Record ID
+            order: 'asc' (oldest first) or 'desc' (newest first, default) (optional)
+            offset: Number of comments to skip (optional)
+            limit: Number of comments to get (default: 10, max: 10) (optional)
+        """
+        ...
+
+    @register_route('POST', '/k/v1/record/comment.json', required=['app', 'record', 'comment'], json_content=True)
+    def add_comment(self, app: str | int, record: str | int, comment: dict) -> Route:
+        """Add a comment to a record
+
+        Args:
+            app: App ID of the record
+            record: Record ID
+            comment: JSON object with the comment `text` and optional `mentions` (list of `{'code', 'type'}`)
+        """
+        ...
+
+    @register_route('POST', '/k/v1/file.json', required=['file'], multipart=True)
+    def upload_file(self, file: tuple) -> Route:
+        """Uploads a file to be attached to a record (returns a `fileKey`)
+
+        Args:
+            file: Tuple of (filename, file object, content type), the file object is streamed in chunks
+
+        Note:
+            The uploaded file is discarded unless it is attached to a record within 3 days
+        """
+        ...
+
+    @register_route('GET', '/k/v1/file.json', required=['fileKey'])
+    def download_file(self, fileKey: str) -> Route:
+        """Downloads a file attached to a record
+
+        Args:
+            fileKey: The `fileKey` of the file, as listed in the value of a FILE field
+
+        Note:
+            Use `route.stream()` to download large files without loading them into memory
+        """
+        ...
+
     @register_route('GET', '/k/v1/app/form/fields.json', required=['app'], json_content=False)
     def get_form_fields(self, app: str | int) -> Route:
         """
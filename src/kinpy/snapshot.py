@@ -0,0 +1,308 @@
+"""Module for snapshotting the records of many Apps at once
+
+`Snapshot` plans a run by counting the records of every App, splits large Apps into `$id`
+ranges, and fetches the partitions on a shared pool of workers, largest first, with a cap
+on the partitions of a single App in flight so small Apps are not starved by large ones.
+Each App is written to its own JSON lines file.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Iterable,
+    TextIO,
+    TYPE_CHECKING,
+)
+from dataclasses import dataclass, field
+
+import contextvars
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+from httpx import HTTPError
+
+from .handlers import HTTPX_Sync, KintoneAPIError
+from .utils import QueryString
+from .tracing import traced
+
+if TYPE_CHECKING:
+    from .interfaces import KintonePortal, KTApp
+
+# Errors that fail a single App of a run instead of the whole run
+_SnapshotErrors: tuple[type[Exception], ...] = (KintoneAPIError, HTTPError, TimeoutError, ValueError)
+
+@dataclass
+class AppSnapshot:
+    """Result of snapshotting a single App"""
+    app: str
+    path: str
+    records: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    partitions: int = 0
+    error: Exception | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'app': self.app,
+            'path': self.path,
+            'records': self.records,
+            'bytes': self.bytes,
+            'elapsed': self.elapsed,
+            'partitions': self.partitions,
+            'error': None if self.error is None else repr(self.error),
+        }
+
+@dataclass
+class SnapshotReport:
+    """Summary of a snapshot run, per App and in total"""
+    apps: dict[str, AppSnapshot] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def records(self) -> int:
+        return sum(app.records for app in self.apps.values())
+
+    @property
+    def bytes(self) -> int:
+        return sum(app.bytes for app in self.apps.values())
+
+    @property
+    def failed(self) -> dict[str, AppSnapshot]:
+        return {key: app for key, app in self.apps.items() if app.error is not None}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'records': self.records,
+            'bytes': self.bytes,
+            'elapsed': self.elapsed,
+            'apps': {key: app.to_dict() for key, app in self.apps.items()},
+        }
+
+    def summary(self) -> str:
+        """Render the run as a table, one line per App, largest first"""
+        lines = [f"{'app':<10} {'records':>10} {'bytes':>14} {'elapsed':>9}"]
+        for app in sorted(self.apps.values(), key=lambda app: app.records, reverse=True):
+            status = '' if app.error is None else f'  FAILED: {app.error!r}'
+            lines.append(f'{app.app:<10} {app.records:>10} {app.bytes:>14} {app.elapsed:>8.2f}s{status}')
+        lines.append(f"{'total':<10} {self.records:>10} {self.bytes:>14} {self.elapsed:>8.2f}s")
+        return '\n'.join(lines)
+
+    def print_summary(self, file: TextIO = None) -> None:
+        print(self.summary(), file=file or sys.stdout)
+
+@dataclass
+class _Partition:
+    app: KTApp
+    fields: list[str]
+    query: QueryString
+    estimate: float
+    index: int
+
+class Snapshot:
+    """Snapshot the records of several Apps of a portal in parallel
+
+    Args:
+        portal: Portal of the Apps (requires a Sync Handler)
+        dest_dir: Directory to write `<app id>.jsonl` files to (created if missing)
+        workers: Partitions fetched at once across all Apps (default: the handler's max_concurrency)
+        max_per_app: Partitions of a single App fetched at once (default: 2)
+        partition_size: Apps with more records are split into `$id` ranges of about this many records (default: 50000)
+        fields: Field codes to fetch per App ID, Apps not listed get all fields of their form (optional)
+
+    Example:
+        >>> report = Snapshot(kintone, 'backup/2024-06-01', workers=8).run()
+        >>> report.print_summary()
+        app           records          bytes   elapsed
+        42             812000     1290318412   1204.55s
+        ...
+    """
+    def __init__(self, portal: KintonePortal, dest_dir: str | os.PathLike, workers: int = None, max_per_app: int = 2,
+                 partition_size: int = 50000, fields: dict[str, list[str]] = None) -> None:
+        if not isinstance(portal.handler, HTTPX_Sync):
+            raise AttributeError("Snapshots require a Sync Handler")
+
+        self._portal = portal
+        self.dest_dir = os.fspath(dest_dir)
+        self.workers = workers or portal.handler.max_concurrency
+        self.max_per_app = max_per_app
+        self.partition_size = partition_size
+        self.fields = {str(app): list(codes) for app, codes in (fields or {}).items()}
+
+    def _resolve(self, apps: Iterable[int | str | KTApp] | None) -> list[KTApp]:
+        from .interfaces import KTApp
+
+        if apps is None:
+            return [KTApp(self._portal, app.appId) for app in self._portal.apps]
+        resolved = []
+        for app in apps:
+            if isinstance(app, KTApp):
+                resolved.append(app)
+            elif str(app).isdigit():
+                resolved.append(KTApp(self._portal, str(app)))
+            else:
+                resolved.append(KTApp(self._portal, self._portal.apps.app_id(app)))
+        return resolved
+
+    def _plan_app(self, app: KTApp) -> tuple[list[str], int, list[_Partition]]:
+        """Fields, record count and partitions of an App"""
+        fields = self.fields.get(str(app.app_id))
+        if fields is None:
+            form = app.get_form_fields()
+            if form is None:
+                raise ValueError(f"Could not get the form fields of app {app.app_id}")
+            fields = list(form['properties'])
+
+        count = app.count_records()
+        if count is None:
+            raise ValueError(f"Could not count the records of app {app.app_id}")
+        parts = max(1, math.ceil(count / self.partition_size))
+        if parts == 1:
+            return fields, count, [_Partition(app, fields, QueryString(''), count, 0)]
+
+        # Split the $id space evenly, ids are assigned in order so ranges hold roughly equal numbers of records
+        response = self._portal.routes.get_records(app=app.app_id, fields='$id', query='order by $id desc limit 1', totalCount=False)()
+        body: dict = json.loads(response.content)
+        if 'records' not in body:
+            raise KintoneAPIError(response)
+        max_id = int(body['records'][0]['$id']['value']) if body['records'] else 0
+        step = math.ceil(max_id / parts)
+        partitions = [
+            _Partition(app, fields, QueryString(f'$id > {i * step} and $id <= {(i + 1) * step}'), count / parts, i)
+            for i in range(parts)
+        ]
+        return fields, count, partitions
+
+    def run(self, apps: Iterable[int | str | KTApp] = None) -> SnapshotReport:
+        """Snapshot the Apps (default: every App in the portal's catalog)
+
+        Apps that fail are recorded in the report with their error, the other Apps carry on.
+        Records created after the run is planned may be missing from Apps split into partitions.
+
+        Returns:
+            SnapshotReport: Records, bytes written and elapsed time per App
+        """
+        start = time.perf_counter()
+        tracer = self._portal.handler.tracer
+        os.makedirs(self.dest_dir, exist_ok=True)
+        report = SnapshotReport()
+
+        with traced(tracer, 'snapshot_plan'):
+            apps = self._resolve(apps)
+            for app in apps:
+                key = str(app.app_id)
+                report.apps[key] = AppSnapshot(key, os.path.join(self.dest_dir, f'{key}.jsonl'))
+
+            def plan(app: KTApp) -> tuple[list[str], int, list[_Partition]] | Exception:
+                try:
+                    return self._plan_app(app)
+                except _SnapshotErrors as e:
+                    return e
+            plans = self._portal.handler.map(plan, apps, max_workers=self.workers)
+
+        pending: list[_Partition] = []
+        for app, result in zip(apps, plans):
+            if isinstance(result, Exception):
+                report.apps[str(app.app_id)].error = result
+                continue
+            report.apps[str(app.app_id)].partitions = len(result[2])
+            pending.extend(result[2])
+        # Largest partitions first, partitions of equal size alternate between Apps
+        pending.sort(key=lambda partition: (-partition.estimate, partition.index))
+
+        _Runner(self, report, pending, tracer).run()
+        report.elapsed = time.perf_counter() - start
+        return report
+
+class _Runner:
+    """Runs the partitions of a snapshot on a pool of worker threads"""
+    def __init__(self, snapshot: Snapshot, report: SnapshotReport, pending: list[_Partition], tracer) -> None:
+        self.snapshot = snapshot
+        self.report = report
+        self.pending = pending
+        self.tracer = tracer
+        self.running: dict[str, int] = {}
+        self.remaining: dict[str, int] = {}
+        self.started: dict[str, float] = {}
+        self.files: dict[str, Any] = {}
+        self.file_locks: dict[str, threading.Lock] = {}
+        self.condition = threading.Condition()
+
+        for partition in pending:
+            key = str(partition.app.app_id)
+            self.remaining[key] = self.remaining.get(key, 0) + 1
+            self.file_locks.setdefault(key, threading.Lock())
+
+    def _next(self) -> _Partition | None:
+        """Take the largest pending partition whose App is below `max_per_app`, None once all are taken"""
+        with self.condition:
+            while self.pending:
+                for i, partition in enumerate(self.pending):
+                    key = str(partition.app.app_id)
+                    if self.running.get(key, 0) < self.snapshot.max_per_app:
+                        self.running[key] = self.running.get(key, 0) + 1
+                        self.started.setdefault(key, time.perf_counter())
+                        return self.pending.pop(i)
+                self.condition.wait()
+            return None
+
+    def _done(self, key: str) -> None:
+        with self.condition:
+            self.running[key] -= 1
+            self.remaining[key] -= 1
+            if not self.remaining[key]:
+                result = self.report.apps[key]
+                result.elapsed = time.perf_counter() - self.started[key]
+                file = self.files.pop(key, None)
+                if file is not None:
+                    file.close()
+            self.condition.notify_all()
+
+    def _write(self, key: str, records: list[dict[str, Any]]) -> None:
+        data = ''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in records).encode('utf-8')
+        with self.file_locks[key]:
+            if key not in self.files:
+                self.files[key] = open(self.report.apps[key].path, 'wb')
+            self.files[key].write(data)
+            result = self.report.apps[key]
+            result.records += len(records)
+            result.bytes += len(data)
+
+    def _fetch(self, partition: _Partition) -> None:
+        key = str(partition.app.app_id)
+        result = self.report.apps[key]
+        try:
+            with traced(self.tracer, 'snapshot_partition', app=key, partition=partition.index):
+                for page in partition.app.iter_record_pages(partition.fields, partition.query):
+                    if result.error is not None:
+                        return # Another partition of the App failed
+                    self._write(key, page)
+        except Exception as e:
+            # Any failure leaves the App's file incomplete, it must not be reported as a success
+            # and must not end the worker, whose other partitions would never be fetched
+            result.error = e
+        finally:
+            self._done(key)
+
+    def _work(self) -> None:
+        while (partition := self._next()) is not None:
+            self._fetch(partition)
+
+    def run(self) -> None:
+        context = contextvars.copy_context()
+        threads = [
+            threading.Thread(target=context.copy().run, args=(self._work,), name=f'kinpy-snapshot-{i}')
+            for i in range(min(self.snapshot.workers, len(self.pending)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Apps with no records still get an (empty) file
+        for result in self.report.apps.values():
+            if result.error is None and not os.path.exists(result.path):
+                open(result.path, 'wb').close()
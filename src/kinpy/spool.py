@@ -0,0 +1,192 @@
+"""Module for spooling records to disk
+
+A spool file holds records as length-prefixed JSON, followed by an index of record offsets.
+Reading maps the file into memory and decodes a record only when it is accessed, so results
+too large to keep in memory as dicts can be read several times, indexed and sliced.
+
+File layout (integers are little-endian)::
+
+    b'KPSPOOL1'                           magic
+    (uint32 length, JSON bytes) * count   records
+    uint64 offset * count                 index
+    uint64 count, uint64 index offset     footer
+    b'KPSPOOL1'                           magic
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    overload,
+)
+from array import array
+from collections.abc import Sequence
+
+import json
+import mmap
+import os
+import struct
+import sys
+
+SpoolMagic: bytes = b'KPSPOOL1'
+
+_Length = struct.Struct('<I')
+_Offset = struct.Struct('<Q')
+_Footer = struct.Struct('<QQ')
+
+class SpoolWriter:
+    """Appends records to a new spool file
+
+    Args:
+        path: File to write (overwritten)
+
+    Note:
+        Used as a context manager, the index is only written when the block completes,
+        a block that raises leaves an incomplete file
+
+    Example:
+        >>> with SpoolWriter('orders.spool') as spool:
+        ...     for page in app.iter_record_pages(['Amount', 'Status']):
+        ...         spool.write(page)
+        >>> records = Spool('orders.spool')
+    """
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = os.fspath(path)
+        self._file = open(self.path, 'wb')
+        self._file.write(SpoolMagic)
+        self._offsets = array('Q')
+        self._offset = len(SpoolMagic)
+
+    def write(self, records: Iterable[dict[str, Any]]) -> int:
+        """Append a page of records
+
+        Returns:
+            int: Number of records written
+        """
+        chunks = []
+        written = 0
+        for record in records:
+            data = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+            self._offsets.append(self._offset)
+            chunks.append(_Length.pack(len(data)))
+            chunks.append(data)
+            self._offset += _Length.size + len(data)
+            written += 1
+        self._file.write(b''.join(chunks))
+        return written
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def close(self) -> None:
+        """Write the index and close the file"""
+        if self._file.closed:
+            return
+        offsets = self._offsets
+        if sys.byteorder != 'little':
+            offsets = array('Q', offsets)
+            offsets.byteswap()
+        self._file.write(offsets.tobytes())
+        self._file.write(_Footer.pack(len(self._offsets), self._offset))
+        self._file.write(SpoolMagic)
+        self._file.close()
+
+    def abort(self) -> None:
+        """Close the file without writing the index, `Spool` refuses to open it"""
+        self._file.close()
+
+    def __enter__(self) -> SpoolWriter:
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        # A block that raised leaves the file incomplete rather than a valid spool of partial results
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __repr__(self):
+        return f'<SpoolWriter {self.path} records={len(self)}>'
+
+class Spool(Sequence):
+    """Read-only sequence of the records in a spool file, decoded on access
+
+    Slices are views on the same file, nothing is decoded until a record is accessed.
+
+    Args:
+        path: Spool file written by `SpoolWriter`
+
+    Raises:
+        ValueError: If the file is not a complete spool file
+
+    Example:
+        >>> with Spool('orders.spool') as records:
+        ...     total = sum(float(record['Amount']) for record in records)
+        ...     latest = records[-100:]
+    """
+    def __init__(self, path: str | os.PathLike, _parent: Spool = None, _rows: range = None) -> None:
+        self.path = os.fspath(path)
+        # Slices are views on their parent's mapping and leave closing it to the parent
+        self._view = _parent is not None
+        if self._view:
+            self._file, self._map, self._index_offset = _parent._file, _parent._map, _parent._index_offset
+            self._rows = _rows
+            return
+
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Empty file
+            self._file.close()
+            raise ValueError(f"{self.path} is not a spool file") from None
+
+        tail = len(SpoolMagic) + _Footer.size
+        if len(self._map) < len(SpoolMagic) + tail or self._map[:len(SpoolMagic)] != SpoolMagic or self._map[-len(SpoolMagic):] != SpoolMagic:
+            self._map.close()
+            self._file.close()
+            raise ValueError(f"{self.path} is not a complete spool file (was the writer closed?)")
+
+        count, self._index_offset = _Footer.unpack_from(self._map, len(self._map) - tail)
+        self._rows = range(count)
+
+    def _decode(self, row: int) -> dict[str, Any]:
+        offset, = _Offset.unpack_from(self._map, self._index_offset + _Offset.size * row)
+        length, = _Length.unpack_from(self._map, offset)
+        start = offset + _Length.size
+        return json.loads(self._map[start:start + length])
+
+    @overload
+    def __getitem__(self, index: int) -> dict[str, Any]: ...
+    @overload
+    def __getitem__(self, index: slice) -> Spool: ...
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Spool(self.path, _parent=self, _rows=self._rows[index])
+        return self._decode(self._rows[index])
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for row in self._rows:
+            yield self._decode(row)
+
+    def close(self) -> None:
+        """Unmap the file, views sliced from the spool can no longer be read
+
+        Closing a slice does nothing, the mapping belongs to the spool it was sliced from.
+        """
+        if self._view:
+            return
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> Spool:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self):
+        return f'<Spool {self.path} records={len(self)}>'
@@ -0,0 +1,86 @@
+"""Module for flattening SUBTABLE fields into child rows
+
+SUBTABLE values are nested inside each record, flattening them splits a page of records
+into parent rows (without the subtables) and child rows per subtable, keyed by the parent
+`$id`, the subtable code and the row id, so nested data can be loaded page by page.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+)
+
+# Columns identifying a child row
+KeyColumns: tuple[str, ...] = ('$id', '$subtable', '$row_id')
+
+def flatten_record(record: dict[str, Any], subtables: Iterable[str]) -> tuple[dict[str, Any], dict[str, list[dict[str, Any]]]]:
+    """Split a record into its parent row and the rows of its subtables
+
+    Args:
+        record: Record as returned by `KTApp.get_records`
+        subtables: Field codes of the SUBTABLE fields to split out
+
+    Returns:
+        tuple: The parent row and the child rows by subtable code
+
+    Example:
+        >>> flatten_record({'$id': '1', 'Items': [{'id': '7', 'value': {'Qty': {'type': 'NUMBER', 'value': '2'}}}]}, ['Items'])
+        ({'$id': '1'}, {'Items': [{'$id': '1', '$subtable': 'Items', '$row_id': '7', 'Qty': '2'}]})
+    """
+    subtables = set(subtables)
+    parent = {code: value for code, value in record.items() if code not in subtables}
+    children = {
+        code: [
+            {
+                '$id': record.get('$id'),
+                '$subtable': code,
+                '$row_id': row.get('id'),
+                **{cell: value.get('value') if isinstance(value, dict) else value for cell, value in row['value'].items()},
+            }
+            for row in record.get(code) or []
+        ]
+        for code in subtables
+    }
+    return parent, children
+
+def _columns(rows: list[dict[str, Any]], cells: list[str] | None) -> dict[str, list[Any]]:
+    if cells is None:
+        # Discover the cells of the page in order of appearance
+        cells = list(dict.fromkeys(cell for row in rows for cell in row if cell not in KeyColumns))
+    return {column: [row.get(column) for row in rows] for column in (*KeyColumns, *cells)}
+
+def flatten_page(records: list[dict[str, Any]], subtables: dict[str, list[str] | None] | Iterable[str], columnar: bool = False) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """Split a page of records into parent rows and child rows per subtable
+
+    Args:
+        records: Page of records
+        subtables: Field codes of the SUBTABLE fields, or a mapping of them to their cell field codes
+            (used as the columns of columnar child tables, otherwise discovered per page)
+        columnar: Return child tables as column name to list of values (default: False)
+
+    Returns:
+        tuple: The parent rows and the child rows (or child tables) by subtable code
+    """
+    if not isinstance(subtables, dict):
+        subtables = dict.fromkeys(subtables)
+
+    parents: list[dict[str, Any]] = []
+    children: dict[str, list[dict[str, Any]]] = {code: [] for code in subtables}
+    for record in records:
+        parent, rows = flatten_record(record, subtables)
+        parents.append(parent)
+        for code, code_rows in rows.items():
+            children[code].extend(code_rows)
+
+    if columnar:
+        return parents, {code: _columns(rows, subtables[code]) for code, rows in children.items()}
+    return parents, children
+
+def iter_flat_pages(pages: Iterable[list[dict[str, Any]]], subtables: dict[str, list[str] | None] | Iterable[str], columnar: bool = False) -> Iterator[tuple[list[dict[str, Any]], dict[str, Any]]]:
+    """Flatten pages of records as they arrive (see `flatten_page`)"""
+    if not isinstance(subtables, dict):
+        subtables = dict.fromkeys(subtables)
+    for page in pages:
+        yield flatten_page(page, subtables, columnar)
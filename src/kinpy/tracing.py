@@ -0,0 +1,176 @@
+"""Module for tracing where time is spent within KinPy operations
+
+Spans are emitted for logical operations (e.g. 'get_records'), the pages and requests they make, and the
+decode/transform stages of each page. Requests are further split into connect/send/wait/receive phases
+using the httpcore `trace` extension.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    TextIO,
+)
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import sys
+import time
+
+@dataclass(eq=False)
+class Span:
+    """A timed section of work, nested under the span that was active when it started"""
+    name: str
+    parent: Span | None = None
+    attrs: dict[str, Any] = field(default_factory=dict)
+    start: float = 0.0
+    end: float | None = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    @property
+    def path(self) -> tuple[str, ...]:
+        """Names of the span and its ancestors, starting at the root"""
+        path = []
+        span = self
+        while span is not None:
+            path.append(span.name)
+            span = span.parent
+        return tuple(reversed(path))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'name': self.name,
+            'path': '/'.join(self.path),
+            'start': self.start,
+            'duration': self.duration,
+            'attrs': self.attrs,
+        }
+
+_current_span: ContextVar[Span | None] = ContextVar('kinpy_current_span', default=None)
+
+# httpcore trace events grouped into request phases
+# e.g. 'http11.receive_response_headers.started' -> 'wait'
+_RequestPhases: dict[str, str] = {
+    'connect_tcp': 'connect',
+    'connect_unix_socket': 'connect',
+    'start_tls': 'connect',
+    'send_request_headers': 'send',
+    'send_request_body': 'send',
+    'receive_response_headers': 'wait',
+    'receive_response_body': 'receive',
+}
+
+class Tracer:
+    """Emits finished spans to collectors
+
+    Args:
+        collectors: Callables receiving every finished `Span` (e.g. a `SpanCollector`), collectors
+            with a `span_started` method also receive spans as they start
+
+    Example:
+        >>> collector = SpanCollector()
+        >>> kintone = KintonePortal('https://example.kintone.com', auth, tracer=Tracer(collector))
+        >>> KTApp(kintone, 1).get_records(['Text'])
+        >>> collector.print_summary()
+        get_records                        1x    2.104s 100.0%
+          page                             5x    2.101s  99.9%
+            request                        5x    1.873s  89.0%
+        ...
+    """
+    def __init__(self, *collectors: Callable[[Span], None], enabled: bool = True) -> None:
+        self.collectors = list(collectors)
+        self.enabled = enabled
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        """Time the enclosed block as a child of the active span"""
+        span = Span(name, _current_span.get(), attrs, time.perf_counter())
+        # Collectors that measure across the span (e.g. MemoryProfiler) are told when it starts
+        for collector in self.collectors:
+            started = getattr(collector, 'span_started', None)
+            if started is not None:
+                started(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+            self.emit(span)
+
+    def emit(self, span: Span) -> None:
+        for collector in self.collectors:
+            collector(span)
+
+    def request_hook(self) -> Callable[[str, dict], None]:
+        """Build an httpcore `trace` extension that emits a span per request phase of a single request"""
+        started: dict[str, float] = {}
+
+        def trace(event: str, info: dict) -> None:
+            *_, step, state = event.split('.')
+            phase = _RequestPhases.get(step)
+            if phase is None:
+                return
+
+            if state == 'started':
+                started.setdefault(phase, time.perf_counter())
+            elif phase in started:
+                self.emit(Span(phase, _current_span.get(), {}, started.pop(phase), time.perf_counter()))
+        return trace
+
+    def async_request_hook(self) -> Callable[[str, dict], Any]:
+        """Async version of `request_hook` for use with `AsyncClient`"""
+        trace = self.request_hook()
+
+        async def async_trace(event: str, info: dict) -> None:
+            trace(event, info)
+        return async_trace
+
+def traced(tracer: Tracer | None, name: str, **attrs):
+    """Return a span for `name` or a no-op context if tracing is disabled"""
+    if tracer is None or not tracer.enabled:
+        return nullcontext()
+    return tracer.span(name, **attrs)
+
+class SpanCollector:
+    """Built-in collector that aggregates spans by their path and prints a flame-style summary
+
+    Args:
+        keep_spans: Also keep every finished span in `spans` (default: False)
+    """
+    def __init__(self, keep_spans: bool = False) -> None:
+        self.keep_spans = keep_spans
+        self.spans: list[Span] = []
+        # {path: [count, total seconds]}
+        self.totals: dict[tuple[str, ...], list] = {}
+
+    def __call__(self, span: Span) -> None:
+        totals = self.totals.setdefault(span.path, [0, 0.0])
+        totals[0] += 1
+        totals[1] += span.duration
+        if self.keep_spans:
+            self.spans.append(span)
+
+    def summary(self) -> str:
+        """Render the aggregated spans as an indented tree with call counts, total time and share of the root"""
+        roots = sum(total for path, (_, total) in self.totals.items() if len(path) == 1) or 1.0
+        width = max((2 * (len(path) - 1) + len(path[-1]) for path in self.totals), default=0) + 2
+
+        lines = []
+        for path in sorted(self.totals):
+            count, total = self.totals[path]
+            label = '  ' * (len(path) - 1) + path[-1]
+            lines.append(f'{label:<{width}} {count:>6}x {total:>9.3f}s {100 * total / roots:>5.1f}%')
+        return '\n'.join(lines)
+
+    def print_summary(self, file: TextIO = None) -> None:
+        print(self.summary(), file=file or sys.stdout)
+
+    def clear(self) -> None:
+        self.spans.clear()
+        self.totals.clear()
@@ -1,6 +1,16 @@
 from __future__ import annotations
 from urllib.parse import quote
 from numbers import Number
+from functools import cached_property
+
+from .query import (
+    Node,
+    Condition,
+    Query,
+    And,
+    Or,
+    parse_query,
+)
 
 class QueryString(str):
     """Class for building a query string.
@@ -9,44 +19,72 @@ class QueryString(str):
         This class is designed to be used with the `__and__` and `__or__` operators
         to allow for chaining of query strings.
 
+        QueryStrings are immutable, comparisons and joins return new QueryString objects
+        holding the condition AST, the rendered string and its URL encoding are computed once.
+
     Example:
         >>> query = QueryString("field")
-        >>> query = query.like("value") & query.not_in(["value1", "value2"])
+        >>> query = query.like("value") & query.not_in("value1", "value2")
         >>> print(query)
-        field like 'value' and field not in ('value1', 'value2')
+        field like "value" and field not in ("value1", "value2")
 
         >>> query.encode()
-        'field%20like%20%27value%27%20and%20field%20not%20in%20%28%27value1%27%2C%20%27value2%27%29'
+        'field%20like%20%22value%22%20and%20field%20not%20in%20%28%22value1%22%2C%20%22value2%22%29'
     """
-    
-    def __init__(self, field: str):
+
+    def __new__(cls, field: str = '', node: Node | None = None):
+        # The rendered query is the string value itself, so it is only ever rendered once
+        self = super().__new__(cls, str(node) if node is not None else field)
         self.value = field
-        self.query = f"{field}"
+        self.node = node
+        return self
+
+    @property
+    def query(self) -> str:
+        return str.__str__(self)
+
+    @cached_property
+    def ast(self) -> Query:
+        """The parsed query (raises ValueError if the string is not a valid query)"""
+        if self.node is not None:
+            return Query(self.node)
+        return parse_query(self.query)
 
     def __repr__(self):
         return self.query
-    
+
     # URL encoding
     def encode(self, safe="", encoding = "utf-8", errors = "strict"):
-        return quote(self.query, encoding=encoding, errors=errors)
+        if (safe, encoding, errors) == ("", "utf-8", "strict"):
+            # Cache the default encoding, it is requested every time the query is sent
+            if '_encoded' not in self.__dict__:
+                self.__dict__['_encoded'] = quote(self.query, safe=safe, encoding=encoding, errors=errors)
+            return self.__dict__['_encoded']
+        return quote(self.query, safe=safe, encoding=encoding, errors=errors)
+
+    def _compare(self, op: str, value) -> QueryString:
+        return QueryString(self.value, Condition(self.value, op, value if isinstance(value, tuple) else str(value)))
 
     # String comparisons
     def like(self, value: str):
-        self.query = f"{self.value} like '{value}'"
-        return self
-    
+        return self._compare('like', value)
+
     def not_like(self, value: str):
-        self.query = f"{self.value} not like '{value}'"
-        return self
+        return self._compare('not like', value)
 
     # Inclusion comparisons
     def in_(self, *values: str):
-        self.query = f"{self.value} in ('{', '.join(str(v) for v in values)}')"
-        return self
-    
+        return self._compare('in', _flatten(values))
+
     def not_in(self, *values: str):
-        self.query = f"{self.value} not in ('{', '.join(str(v) for v in values)}')"
-        return self
+        return self._compare('not in', _flatten(values))
+
+    # Empty checks
+    def is_empty(self):
+        return QueryString(self.value, Condition(self.value, 'is empty'))
+
+    def is_not_empty(self):
+        return QueryString(self.value, Condition(self.value, 'is not empty'))
 
     # Query Joins (These create new QueryString objects)
     def __add__(self, other: QueryString):
@@ -54,38 +92,68 @@ class QueryString(str):
         if self and other:
             return QueryString(f"{self.query} {other.query}")
         return QueryString( self.query + other.query )
+
+    def _join(self, other: QueryString, joiner: type[And] | type[Or]) -> QueryString:
+        if not (self and other):
+            return self + other
+
+        left, right = _condition(self), _condition(other)
+        if left is None or right is None:
+            word = 'and' if joiner is And else 'or'
+            return QueryString(f"{self.query} {word} {other.query}")
+
+        # Flatten chains of the same operator, e.g. (a and b) and c -> a and b and c
+        terms = (
+            *(left.terms if isinstance(left, joiner) else (left,)),
+            *(right.terms if isinstance(right, joiner) else (right,)),
+        )
+        return QueryString(self.value, joiner(terms))
+
     def __and__(self, other: QueryString):
-        if self and other:
-            return QueryString(f"{self.query} and {other.query}")
-        return self + other
-    
+        return self._join(other, And)
+
     def __or__(self, other: QueryString):
-        if self and other:
-            return QueryString(f"{self.query} or {other.query}")
-        return self + other
-    
+        return self._join(other, Or)
+
+    # QueryStrings are still hashed as their rendered string
+    __hash__ = str.__hash__
+
     # String/Number comparisons
     def __eq__(self, other: str):
-        self.query = f"{self.value} = '{other}'"
-        return self
-    
+        return self._compare('=', other)
+
     def __ne__(self, other: str):
-        self.query = f"{self.value} != '{other}'"
-        return self
-    
+        return self._compare('!=', other)
+
     # Numeric comparisons
     def __lt__(self, val: Number):
-        self.query = f"{self.value} < '{val}'"
-        return self
-    
+        return self._compare('<', val)
+
     def __le__(self, val: Number):
-        self.query = f"{self.value} <= '{val}'"
-        return self
-    
+        return self._compare('<=', val)
+
     def __gt__(self, val: Number):
-        self.query = f"{self.value} > '{val}'"
-        return self
-    
+        return self._compare('>', val)
+
     def __ge__(self, val: Number):
-        self.query = f"{self.value} >= '{val}'"
-        return self
\ No newline at end of file
+        return self._compare('>=', val)
+
+def _flatten(values: tuple) -> tuple[str, ...]:
+    """Allow passing values both as arguments and as a single list"""
+    if len(values) == 1 and isinstance(values[0], (list, tuple, set)):
+        values = tuple(values[0])
+    return tuple(str(v) for v in values)
+
+def _condition(query: str) -> Node | None:
+    """Get the condition AST of a query, None if it has other clauses (order by, limit) or does not parse"""
+    if not isinstance(query, QueryString):
+        query = QueryString(query)
+    if query.node is not None:
+        return query.node
+    try:
+        ast = query.ast
+    except ValueError:
+        return None
+    if ast.order_by or ast.limit is not None or ast.offset is not None:
+        return None
+    return ast.condition
@@ -0,0 +1,345 @@
+"""Module for keeping local records fresh from Kintone webhooks
+
+`WebhookReceiver` parses the record add/edit/delete/status webhook payloads Kintone sends and applies
+them to a `RecordStore`, an in-process replica of the records of one or more Apps. The receiver is an
+ASGI app, and can also be served by the standard library `http.server` for tests and small deployments.
+Webhooks are not retried indefinitely, `RecordStore.poll` fetches the records changed since the
+latest update it has seen to cover missed events.
+"""
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    TYPE_CHECKING,
+)
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import json
+import logging
+import threading
+
+from .utils import QueryString
+
+if TYPE_CHECKING:
+    from .interfaces import KTApp
+
+logger = logging.getLogger(__name__)
+
+# Webhook types carrying the full record after the change
+RecordEventTypes: set[str] = {'ADD_RECORD', 'UPDATE_RECORD', 'UPDATE_STATUS'}
+
+@dataclass
+class WebhookEvent:
+    """A parsed webhook notification
+
+    Attributes:
+        id: Notification ID (the same for retries of a notification)
+        type: 'ADD_RECORD', 'UPDATE_RECORD', 'DELETE_RECORD', 'UPDATE_STATUS' or 'ADD_RECORD_COMMENT'
+        app_id: App ID of the record
+        record_id: Record ID
+        record: The record after the change as `{field_code: value}` (None for deletes and comments)
+        payload: The raw payload
+    """
+    id: str
+    type: str
+    app_id: str
+    record_id: str
+    record: dict[str, Any] | None = None
+    payload: dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> WebhookEvent:
+        """Parse a webhook payload
+
+        Raises:
+            ValueError: If the payload is not a Kintone record webhook
+        """
+        try:
+            event_type = payload['type']
+            app_id = str(payload['app']['id'])
+        except (KeyError, TypeError):
+            raise ValueError("Payload is not a Kintone webhook notification") from None
+
+        record = None
+        try:
+            if event_type in RecordEventTypes:
+                record = {code: value.get('value') for code, value in payload['record'].items()}
+                record_id = record['$id']
+            else:
+                record_id = payload['recordId']
+        except (KeyError, TypeError, AttributeError):
+            raise ValueError(f"{event_type} notification is missing its record or record ID") from None
+
+        return cls(
+            id=str(payload.get('id', '')),
+            type=event_type,
+            app_id=app_id,
+            record_id=str(record_id),
+            record=record,
+            payload=payload,
+        )
+
+class RecordStore:
+    """In-process replica of the records of one or more Apps
+
+    Args:
+        updated_field: Field code of the "Updated datetime" field, used as the cursor of `poll`
+            (default: 'Updated_datetime')
+
+    Note:
+        Updates carrying an older `$revision` than the stored record are ignored,
+        so notifications applied out of order do not roll records back
+
+    Example:
+        >>> store = RecordStore()
+        >>> store.load(app, ['Status', 'Updated_datetime'])
+        >>> receiver = WebhookReceiver(store)
+        >>> store.get(app.app_id, 42)['Status']
+        'Done'
+    """
+    def __init__(self, updated_field: str = 'Updated_datetime') -> None:
+        self.updated_field = updated_field
+        self._records: dict[str, dict[str, dict[str, Any]]] = {}
+        self._cursors: dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def put(self, app_id: int | str, record: dict[str, Any]) -> bool:
+        """Store a record (as returned by `KTApp.get_records`), False if the stored revision is newer"""
+        app_id, record_id = str(app_id), str(record['$id'])
+        with self._lock:
+            records = self._records.setdefault(app_id, {})
+            current = records.get(record_id)
+            if current is not None and int(current.get('$revision') or 0) > int(record.get('$revision') or 0):
+                return False
+            records[record_id] = {**current, **record} if current is not None else dict(record)
+            return True
+
+    def _advance(self, app_id: str, record: dict[str, Any]) -> None:
+        """Move the poll cursor of an App to a fetched record's update time
+
+        Only records fetched by `load` and `poll` move the cursor, a webhook arriving after
+        missed ones must not let `poll` skip the missed updates.
+        """
+        updated = record.get(self.updated_field)
+        with self._lock:
+            if updated and updated > self._cursors.get(app_id, ''):
+                self._cursors[app_id] = updated
+
+    def delete(self, app_id: int | str, record_id: int | str) -> bool:
+        with self._lock:
+            return self._records.get(str(app_id), {}).pop(str(record_id), None) is not None
+
+    def apply(self, event: WebhookEvent) -> bool:
+        """Apply a webhook event, False if it did not change the store"""
+        if event.type == 'DELETE_RECORD':
+            return self.delete(event.app_id, event.record_id)
+        if event.record is not None:
+            return self.put(event.app_id, event.record)
+        return False
+
+    def get(self, app_id: int | str, record_id: int | str) -> dict[str, Any] | None:
+        with self._lock:
+            return self._records.get(str(app_id), {}).get(str(record_id))
+
+    def records(self, app_id: int | str) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._records.get(str(app_id), {}).values())
+
+    def load(self, app: KTApp, fields: list[str], query: QueryString = QueryString('')) -> int:
+        """Replace the replica of an App with its records, page by page
+
+        Returns:
+            int: Number of records loaded
+        """
+        fields = list(dict.fromkeys([*fields, '$revision', self.updated_field]))
+        app_id = str(app.app_id)
+        with self._lock:
+            self._records[app_id] = {}
+            self._cursors.pop(app_id, None)
+
+        count = 0
+        for page in app.iter_record_pages(fields, query):
+            for record in page:
+                self.put(app_id, record)
+                self._advance(app_id, record)
+            count += len(page)
+        return count
+
+    def poll(self, app: KTApp, fields: list[str], detect_deletes: bool = False) -> int:
+        """Fetch the records updated since the latest update seen by `load` or `poll`, to cover missed webhooks
+
+        Args:
+            app: App to poll
+            fields: Field codes to fetch
+            detect_deletes: Also fetch every `$id` of the App to remove deleted records (default: False)
+
+        Returns:
+            int: Number of records added, updated or removed
+        """
+        fields = list(dict.fromkeys([*fields, '$revision', self.updated_field]))
+        app_id = str(app.app_id)
+        cursor = self._cursors.get(app_id)
+        # Datetimes are compared to the minute, `>=` refetches the records of the latest minute
+        query = QueryString(self.updated_field) >= cursor if cursor else QueryString('')
+
+        changed = 0
+        for page in app.iter_record_pages(fields, query):
+            for record in page:
+                current = self.get(app_id, record['$id'])
+                if (current is None or current.get('$revision') != record.get('$revision')) and self.put(app_id, record):
+                    changed += 1
+                self._advance(app_id, record)
+
+        if detect_deletes:
+            ids = {record['$id'] for page in app.iter_record_pages([]) for record in page}
+            with self._lock:
+                deleted = self._records.get(app_id, {}).keys() - ids
+                for record_id in deleted:
+                    self.delete(app_id, record_id)
+            changed += len(deleted)
+
+        return changed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(records) for records in self._records.values())
+
+    def __repr__(self):
+        return f'<RecordStore apps={len(self._records)} records={len(self)}>'
+
+class WebhookReceiver:
+    """Receives Kintone webhook notifications and applies them to a `RecordStore`
+
+    Args:
+        store: Replica to apply the events to (optional)
+        apps: Only accept notifications of these App IDs (default: all)
+        history: Number of notification IDs remembered to drop retried notifications (default: 1024)
+
+    Note:
+        Kintone does not sign webhook notifications, only expose the receiver
+        on networks Kintone (or your proxy) can reach
+
+    Example:
+        >>> receiver = WebhookReceiver(store, apps=[12])
+        >>> receiver.subscribe(lambda event: print(event.type, event.record_id))
+
+        Served by any ASGI server:
+        >>> uvicorn.run(receiver, port=8080)
+
+        Or by the standard library, e.g. in tests:
+        >>> server = receiver.make_server(port=0)
+        >>> threading.Thread(target=server.serve_forever, daemon=True).start()
+    """
+    def __init__(self, store: RecordStore = None, apps: Iterable[int | str] = None, history: int = 1024) -> None:
+        self.store = store
+        self.apps = {str(app) for app in apps} if apps is not None else None
+        self.history = history
+        self._listeners: list[Callable[[WebhookEvent], Any]] = []
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Callable[[WebhookEvent], Any]) -> None:
+        """Call `listener` with every accepted event
+
+        Note:
+            Exceptions raised by a listener are logged, they don't reach the sender of the notification
+            (Kintone would retry it, and the retry is dropped as a duplicate) or the other listeners
+        """
+        self._listeners.append(listener)
+
+    def _is_new(self, event_id: str) -> bool:
+        if not event_id:
+            return True
+        with self._lock:
+            if event_id in self._seen:
+                return False
+            self._seen[event_id] = None
+            if len(self._seen) > self.history:
+                self._seen.popitem(last=False)
+            return True
+
+    def handle(self, payload: dict[str, Any] | bytes | str) -> WebhookEvent | None:
+        """Parse and apply a notification
+
+        Returns:
+            WebhookEvent | None: The event, None if it was filtered out or already received
+
+        Raises:
+            ValueError: If the payload is not a Kintone webhook notification
+        """
+        if isinstance(payload, (bytes, str)):
+            payload = json.loads(payload)
+        event = WebhookEvent.from_payload(payload)
+
+        if self.apps is not None and event.app_id not in self.apps:
+            return None
+        if not self._is_new(event.id):
+            return None
+
+        if self.store is not None:
+            self.store.apply(event)
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Webhook listener %r failed on %s event %s", listener, event.type, event.id)
+        return event
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable, send: Callable) -> None:
+        """ASGI app accepting notifications as POST requests on any path"""
+        if scope['type'] == 'lifespan':
+            while (message := await receive())['type'] != 'lifespan.shutdown':
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        status, response = self._respond(scope['method'], body)
+        await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': response})
+
+    def _respond(self, method: str, body: bytes) -> tuple[int, bytes]:
+        if method != 'POST':
+            return 405, b'{"message": "Method not allowed"}'
+        try:
+            self.handle(body)
+        except ValueError as e:
+            return 400, json.dumps({'message': str(e)}).encode()
+        return 200, b'{}'
+
+    def make_server(self, host: str = '127.0.0.1', port: int = 8080) -> ThreadingHTTPServer:
+        """Build a standard library HTTP server for the receiver (port 0 picks a free port)"""
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: bytes) -> None:
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self._reply(*receiver._respond('POST', body))
+
+            def do_GET(self):
+                self._reply(*receiver._respond('GET', b''))
+
+            def log_message(self, format, *args):
+                pass
+
+        return ThreadingHTTPServer((host, port), Handler)